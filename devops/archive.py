@@ -0,0 +1,152 @@
+#
+# devops archive
+#
+# Compressed NDJSON archive of records (alert details) kept before they
+# are deleted on the server.
+#
+# Records are appended in blocks of BLOCK_RECORDS, each block written as
+# one complete gzip member (or zstd frame for files ending in .zst, when
+# the zstandard package is installed) and synced to disk.  Memory use does
+# not depend on the archive size, apart from the set of archived ids kept
+# so that an interrupted archive can be resumed without duplicates.
+#
+# If a run is killed while writing a block, the partial block is cut off
+# the end of the file the next time the archive is opened.
+#
+# gzip archives can also be read with zcat.
+#
+
+import gzip
+import json
+import os
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BLOCK_RECORDS = 100
+READ_SIZE = 1024 * 1024
+
+
+class GzipCodec:
+    def compress(self, data):
+        return gzip.compress(data)
+
+    def decompressobj(self):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+
+class ZstdCodec:
+    def __init__(self):
+        if zstandard == None:
+            raise Exception('zstd archives need the zstandard package')
+        self.compressor = zstandard.ZstdCompressor()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def decompressobj(self):
+        return zstandard.ZstdDecompressor().decompressobj()
+
+
+def archive_codec(filename):
+    if filename.endswith('.zst'):
+        return ZstdCodec()
+    return GzipCodec()
+
+def loads(line):
+    if orjson != None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+def dumps(record):
+    if orjson != None:
+        return orjson.dumps(record)
+    return json.dumps(record, separators=(',', ':')).encode('utf-8')
+
+#
+# yield (lines, end) for every complete block in filename, where end is
+# the file offset just past the block
+#
+def archive_blocks(filename):
+    codec = archive_codec(filename)
+    with open(filename, 'rb') as archivefile:
+        start = 0
+        fed = 0
+        out = []
+        dec = codec.decompressobj()
+        data = archivefile.read(READ_SIZE)
+        while len(data) > 0:
+            out.append(dec.decompress(data))
+            if dec.eof:
+                unused = dec.unused_data
+                end = start + fed + len(data) - len(unused)
+                yield b''.join(out).splitlines(), end
+                start = end
+                fed = 0
+                out = []
+                dec = codec.decompressobj()
+                data = unused if len(unused) > 0 else archivefile.read(READ_SIZE)
+            else:
+                fed = fed + len(data)
+                data = archivefile.read(READ_SIZE)
+
+#
+# stream the records of an archive
+#
+def archive_read(filename):
+    for lines, end in archive_blocks(filename):
+        for line in lines:
+            yield loads(line)
+
+
+class ArchiveWriter:
+    def __init__(self, filename):
+        self.filename = os.path.expanduser(filename)
+        self.codec = archive_codec(self.filename)
+        self.ids = set()
+        self.pending = []
+        self.count = 0
+        if os.path.exists(self.filename):
+            self.recover()
+
+    # collect archived ids and cut off a partly written last block
+    def recover(self):
+        good = 0
+        for lines, end in archive_blocks(self.filename):
+            for line in lines:
+                self.ids.add(loads(line)['id'])
+            good = end
+        if good < os.path.getsize(self.filename):
+            with open(self.filename, 'r+b') as archivefile:
+                archivefile.truncate(good)
+
+    def has(self, id):
+        return id in self.ids
+
+    def write(self, record):
+        self.pending.append(dumps(record) + b'\n')
+        self.ids.add(record['id'])
+        self.count = self.count + 1
+        if len(self.pending) >= BLOCK_RECORDS:
+            self.flush()
+
+    # write the pending records as one block and sync it to disk
+    def flush(self):
+        if len(self.pending) == 0:
+            return
+        with open(self.filename, 'ab') as archivefile:
+            archivefile.write(self.codec.compress(b''.join(self.pending)))
+            archivefile.flush()
+            os.fsync(archivefile.fileno())
+        self.pending = []
+
+    def close(self):
+        self.flush()
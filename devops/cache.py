@@ -0,0 +1,223 @@
+#
+# devops response cache
+#
+# Read-through cache for GET wrappers that are called again and again with
+# the same arguments, e.g. procdef_get or hb_get.  A wrapper is cached with
+#
+#   @cached('procdef_get', MY_SECTION)
+#   def procdef_get(procDefId):
+#
+# and the cache key is the endpoint name, the wrapper arguments and the
+# settings of the active profile in section (url, user, api key), hashed.
+# Entries live for CACHE_TTLS[endpoint] seconds.
+#
+# Lookups go through a list of tiers, fastest first:
+#
+#   MemoryTier  LRU of encoded responses, evicted by total size
+#   DiskTier    one file per entry under --cache-dir, evicted by total size,
+#               so repeated commands in a script share responses
+#
+# Wrappers that change data call invalidate() or invalidate_endpoint() so
+# the next read goes back to the server.
+#
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# config module
+from devops.config import my_config, profileSection
+
+# seconds a response stays fresh, 0 turns caching off for the endpoint
+CACHE_TTLS = {
+    'procdef_get': 300,
+    'hcleanup_getconfig': 300,
+    'hb_getlist': 60,
+    'hb_get': 15,
+    'alerts_get': 60,
+}
+
+MEMORY_BYTES = 16 * 1024 * 1024
+DISK_BYTES = 64 * 1024 * 1024
+
+
+class MemoryTier:
+    def __init__(self, maxBytes):
+        self.maxBytes = maxBytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, endpoint, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry == None:
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, endpoint, key, expires, text):
+        with self.lock:
+            self.remove(key)
+            self.entries[key] = (endpoint, expires, text)
+            self.size = self.size + len(text)
+            while self.size > self.maxBytes and len(self.entries) > 0:
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry != None:
+            self.size = self.size - len(entry[2])
+
+    def invalidate(self, endpoint, key):
+        with self.lock:
+            self.remove(key)
+
+    def invalidate_endpoint(self, endpoint):
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if entry[0] == endpoint]:
+                self.remove(key)
+
+
+class DiskTier:
+    def __init__(self, dirname, maxBytes):
+        self.dirname = os.path.expanduser(dirname)
+        self.maxBytes = maxBytes
+        # bytes on disk, counted on the first write then kept up to date
+        self.size = None
+        self.lock = threading.Lock()
+
+    def path(self, endpoint, key):
+        return os.path.join(self.dirname, endpoint, key + '.json')
+
+    def get(self, endpoint, key):
+        try:
+            with open(self.path(endpoint, key)) as entryfile:
+                entry = json.load(entryfile)
+        except (OSError, ValueError):
+            return None
+        return (endpoint, entry['expires'], entry['text'])
+
+    def set(self, endpoint, key, expires, text):
+        filename = self.path(endpoint, key)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        # write then rename so concurrent readers never see half an entry
+        tmpname = filename + '.' + str(threading.get_ident()) + '.tmp'
+        with open(tmpname, 'w') as entryfile:
+            json.dump({'expires': expires, 'text': text}, entryfile)
+        os.replace(tmpname, filename)
+        with self.lock:
+            if self.size != None:
+                self.size = self.size + os.path.getsize(filename)
+        if self.size == None or self.size > self.maxBytes:
+            self.evict()
+
+    # remove the least recently written entries until under maxBytes
+    def evict(self):
+        with self.lock:
+            files = []
+            total = 0
+            for dirpath, dirnames, filenames in os.walk(self.dirname):
+                for name in filenames:
+                    filename = os.path.join(dirpath, name)
+                    try:
+                        info = os.stat(filename)
+                    except OSError:
+                        continue
+                    files.append((info.st_mtime, info.st_size, filename))
+                    total = total + info.st_size
+            files.sort()
+            for mtime, size, filename in files:
+                if total <= self.maxBytes:
+                    break
+                self.unlink(filename)
+                total = total - size
+            self.size = total
+
+    def unlink(self, filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    def invalidate(self, endpoint, key):
+        self.unlink(self.path(endpoint, key))
+
+    def invalidate_endpoint(self, endpoint):
+        dirname = os.path.join(self.dirname, endpoint)
+        if os.path.isdir(dirname):
+            for name in os.listdir(dirname):
+                self.unlink(os.path.join(dirname, name))
+
+
+my_tiers = [MemoryTier(MEMORY_BYTES)]
+
+#
+# add an on-disk tier below the memory tier
+#
+def use_disk_cache(dirname):
+    my_tiers.append(DiskTier(dirname, DISK_BYTES))
+
+def disable_cache():
+    del my_tiers[:]
+
+def cache_key(endpoint, section, args):
+    settings = {}
+    sectionName = profileSection(section)
+    if my_config.has_section(sectionName):
+        settings = dict(my_config[sectionName])
+    text = json.dumps([endpoint, settings, args], sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+#
+# return the cached response for the call, or call func and cache its response
+#
+def read_through(endpoint, section, func, args):
+    ttl = CACHE_TTLS.get(endpoint, 0)
+    if ttl <= 0 or len(my_tiers) == 0:
+        return func(*args)
+    key = cache_key(endpoint, section, args)
+    now = time.time()
+    for i, tier in enumerate(my_tiers):
+        entry = tier.get(endpoint, key)
+        if entry != None and entry[1] > now:
+            # copy into the faster tiers that missed
+            for faster in my_tiers[:i]:
+                faster.set(endpoint, key, entry[1], entry[2])
+            # decode on every hit so callers can change the result freely
+            return json.loads(entry[2])
+    res = func(*args)
+    text = json.dumps(res)
+    for tier in my_tiers:
+        tier.set(endpoint, key, now + ttl, text)
+    return res
+
+#
+# decorator for GET wrappers, see the top of this file
+#
+def cached(endpoint, section):
+    def decorate(func):
+        def wrapper(*args):
+            return read_through(endpoint, section, func, args)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+    return decorate
+
+#
+# drop the cached response of one call, args as passed to the wrapper
+#
+def invalidate(endpoint, section, *args):
+    key = cache_key(endpoint, section, args)
+    for tier in my_tiers:
+        tier.invalidate(endpoint, key)
+
+#
+# drop every cached response of an endpoint
+#
+def invalidate_endpoint(endpoint):
+    for tier in my_tiers:
+        tier.invalidate_endpoint(endpoint)
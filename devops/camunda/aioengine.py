@@ -0,0 +1,274 @@
+#
+# Camunda REST API, asyncio engine
+#
+# --engine async runs a command's REST calls as asyncio tasks on one thread
+# with aiohttp (pip install .[async]), so thousands of calls can be in
+# flight without a thread each.  Connections to the engine are limited to
+# --connections; calls beyond that wait for a free connection, so the
+# Camunda server sees no more load than with a thread pool of that size.
+#
+# Calls are retried as in devops.retry: 429 always, 502/503/504 and lost
+# connections only for idempotent methods, with the same backoff.  An open
+# circuit breaker makes the tasks sleep, not block the loop.  The hooks
+# of devops.stats (--stats, --trace) see every attempt.
+#
+# aiohttp is imported on first use, so the sync commands don't pay for it.
+#
+# Author: Chris Maeda (cmaeda@cmaeda.com)
+
+import asyncio
+import click
+import importlib
+import json
+import time
+
+# config module
+from devops.config import getKey, MY_SECTION
+from devops import retry, stats
+from devops.errors import rest_error
+from devops.cache import invalidate
+from devops.records import IdList
+
+ENGINES = ['sync', 'async']
+ENGINE_CONNECTIONS = 32
+
+aiohttp = None
+
+
+def engine_options(func):
+    func = click.option('--connections', default=ENGINE_CONNECTIONS,
+                        help='concurrent requests to the engine with --engine async')(func)
+    func = click.option('--engine', 'engine', type=click.Choice(ENGINES), default='sync',
+                        help='run the REST calls on threads (sync) or as asyncio tasks (async)')(func)
+    return func
+
+def load_aiohttp():
+    global aiohttp
+    if aiohttp == None:
+        try:
+            aiohttp = importlib.import_module('aiohttp')
+        except ImportError:
+            raise Exception('--engine async needs the aiohttp package, pip install .[async]')
+    return aiohttp
+
+#
+# request and response as seen by the devops.stats hooks and rest_error
+#
+class AsyncRequest:
+    def __init__(self, method, url, body):
+        self.method = method
+        self.url = url
+        self.body = body
+
+
+class AsyncResponse:
+    def __init__(self, status, headers, content):
+        self.status_code = status
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+
+class AsyncEngine:
+    def __init__(self, connections):
+        load_aiohttp()
+        self.url = getKey('url') + '/engine/default'
+        self.auth = aiohttp.BasicAuth(getKey('username'), getKey('password'))
+        self.connections = connections
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.connections, limit_per_host=self.connections)
+        # no total timeout: calls may queue for a connection for a long time
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=300)
+        self.session = aiohttp.ClientSession(connector=connector, auth=self.auth, timeout=timeout)
+        return self
+
+    async def __aexit__(self, *excinfo):
+        await self.session.close()
+
+    #
+    # one call with retries, returns the response or raises rest_error
+    # when its status isn't expect
+    #
+    async def call(self, method, path, params=None, body=None, expect=200):
+        url = self.url + path
+        if params != None:
+            params = {key: query_value(value) for key, value in params.items()}
+        headers = {'Content-Type': 'application/json'} if body != None else None
+        breaker = retry.breaker_for(url)
+        idempotent = method in retry.IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            await breaker_wait(breaker)
+            request = AsyncRequest(method, url, body)
+            start = time.perf_counter()
+            try:
+                async with self.session.request(method, url, params=params, data=body, headers=headers) as resp:
+                    request.url = str(resp.url)
+                    response = AsyncResponse(resp.status, resp.headers, await resp.read())
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                if stats.hooks_enabled():
+                    stats.dispatch(request, None, time.perf_counter() - start, exc)
+                breaker.failure()
+                # a failed connect never reached the server
+                safe = idempotent or isinstance(exc, aiohttp.ClientConnectorError)
+                if attempt >= retry.my_retries or not safe:
+                    raise
+                await wait(retry.backoff_delay(attempt))
+                attempt = attempt + 1
+                continue
+            if stats.hooks_enabled():
+                stats.dispatch(request, response, time.perf_counter() - start, None)
+            if response.status_code >= 500:
+                breaker.failure()
+            else:
+                breaker.success()
+            retryable = response.status_code == 429 or (idempotent and response.status_code in retry.RETRY_STATUS)
+            if retryable and attempt < retry.my_retries:
+                await wait(retry.backoff_delay(attempt, retry.retry_after(response)))
+                attempt = attempt + 1
+                continue
+            if response.status_code != expect:
+                raise rest_error(response)
+            return response
+
+    async def get_json(self, path, params=None):
+        response = await self.call('GET', path, params)
+        return json.loads(response.text)
+
+
+def query_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+# sleep while the breaker is open, without blocking the other tasks
+async def breaker_wait(breaker):
+    while breaker.failures >= breaker.threshold and time.monotonic() < breaker.openUntil:
+        await wait(breaker.openUntil - time.monotonic())
+
+async def wait(seconds):
+    stats.record_retry_wait(seconds)
+    await asyncio.sleep(seconds)
+
+#
+# run main(client, *args) on a new event loop, with an AsyncEngine for
+# the current profile as client
+#
+def run_engine(connections, main, *args):
+    try:
+        client = AsyncEngine(connections)
+    except Exception as exc:
+        click.echo('Error: ' + str(exc.args[0]))
+        return None
+
+    async def run():
+        async with client:
+            return await main(client, *args)
+
+    return asyncio.run(run())
+
+#
+# await func(item) for every item, with at most workers calls running.
+# Results come back in completion order.  The first error cancels the
+# other calls and is raised.
+#
+async def run_all(func, items, workers):
+    items = iter(items)
+    res = []
+
+    async def worker():
+        for item in items:
+            res.append(await func(item))
+
+    tasks = [asyncio.ensure_future(worker()) for i in range(workers)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return res
+
+#
+# REST API Calls, see the sync versions in procdef.py, deployment.py and
+# historycleanup.py
+#
+
+async def procdef_list(engine, tenantId, deploymentid):
+    params = {}
+    if tenantId != None:
+        params['tenantIdIn'] = tenantId
+    if deploymentid != None:
+        params['deploymentId'] = deploymentid
+    return await engine.get_json('/process-definition', params)
+
+async def procdef_count(engine, tenantId, deploymentid):
+    params = {}
+    if tenantId != None:
+        params['tenantIdIn'] = tenantId
+    if deploymentid != None:
+        params['deploymentId'] = deploymentid
+    return await engine.get_json('/process-definition/count', params)
+
+async def procdef_get(engine, procDefId):
+    return await engine.get_json('/process-definition/' + procDefId)
+
+async def procdef_set_hittl(engine, procDefId, hittl):
+    body = '{"historyTimeToLive":' + str(hittl) + '}'
+    await engine.call('PUT', '/process-definition/' + procDefId + '/history-time-to-live', body=body, expect=204)
+    invalidate('procdef_get', MY_SECTION, procDefId)
+
+async def procinst_page(engine, procDefId, deploymentid, firstResult, maxResults):
+    params = {'firstResult': firstResult, 'maxResults': maxResults, 'sortBy': 'instanceId', 'sortOrder': 'asc'}
+    if procDefId != None:
+        params['processDefinitionId'] = procDefId
+    if deploymentid != None:
+        params['deploymentId'] = deploymentid
+    return await engine.get_json('/process-instance', params)
+
+async def procinst_list(engine, procDefId, deploymentid):
+    params = {}
+    if procDefId != None:
+        params['processDefinitionId'] = procDefId
+    if deploymentid != None:
+        params['deploymentId'] = deploymentid
+    return await engine.get_json('/process-instance', params)
+
+# ids of the process instances of a definition, a page at a time
+async def procinst_ids(engine, procDefId, deploymentid, pageSize):
+    ids = IdList()
+    firstResult = 0
+    while True:
+        page = await procinst_page(engine, procDefId, deploymentid, firstResult, pageSize)
+        ids.extend([phist['id'] for phist in page])
+        if len(page) < pageSize:
+            return ids
+        firstResult = firstResult + pageSize
+
+async def procinst_delete(engine, procInstId):
+    await engine.call('DELETE', '/process-instance/' + procInstId, expect=204)
+
+async def hist_count(engine, kind, procDefId):
+    res = await engine.get_json('/history/' + kind + '/count', {'processDefinitionId': procDefId})
+    return res['count']
+
+async def deployment_list(engine, tenantId):
+    params = {}
+    if tenantId != None:
+        params['tenantIdIn'] = tenantId
+    return await engine.get_json('/deployment', params)
+
+async def deployment_count(engine, tenantId):
+    params = {}
+    if tenantId != None:
+        params['tenantIdIn'] = tenantId
+    return await engine.get_json('/deployment/count', params)
+
+async def hcleanup_getjobs(engine):
+    return await engine.get_json('/job')
@@ -0,0 +1,80 @@
+#
+# Camunda Batch REST API
+#
+# Helpers shared by the commands that hand bulk work to the engine as
+# asynchronous batches (historic deletion, job retries, migration).
+#
+# Author: Chris Maeda (cmaeda@cmaeda.com)
+
+import click
+from requests.auth import HTTPBasicAuth
+import json
+import time
+
+# config module
+from devops.config import getKey
+from devops.client import getSession
+from devops.errors import rest_error
+
+#
+# REST API Calls
+#
+
+# Get statistics for a running batch
+# Returns None once the batch has finished and was removed from the runtime tables.
+# See https://docs.camunda.org/manual/7.8/reference/rest/batch/get-statistics-query/
+def batch_statistics(batchId):
+    params = {'batchId': batchId}
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/batch/statistics'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    resp = getSession().get(my_url, auth=HTTPBasicAuth(my_user, my_pass), params=params)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    if len(respjson) == 0:
+        return None
+    return respjson[0]
+
+#
+# split a list of ids into chunks of at most chunkSize
+#
+def batch_chunks(ids, chunkSize):
+    for i in range(0, len(ids), chunkSize):
+        yield ids[i:i + chunkSize]
+
+#
+# poll the engine until all batches in batchIds are finished.
+# Progress is echoed every interval seconds.
+# A batch whose remaining jobs have all failed will not finish on its own,
+# so it is reported and dropped from the wait list.
+# Returns the number of failed batch jobs.
+#
+def batch_wait(batchIds, interval):
+    pending = [bid for bid in batchIds]
+    failed = 0
+    while True:
+        totalJobs = 0
+        completedJobs = 0
+        running = []
+        for batchId in pending:
+            stats = batch_statistics(batchId)
+            if stats == None:
+                # batch is done and was removed by its monitor job
+                continue
+            if stats['failedJobs'] > 0 and stats['remainingJobs'] == stats['failedJobs']:
+                click.echo('Batch ' + batchId + ' stuck with failed jobs:' + str(stats['failedJobs']))
+                failed = failed + stats['failedJobs']
+                continue
+            running.append(batchId)
+            totalJobs = totalJobs + stats['totalJobs']
+            completedJobs = completedJobs + stats['completedJobs']
+        pending = running
+        if len(pending) == 0:
+            return failed
+        click.echo('Batches running:' + str(len(pending)) + ' jobs completed:' + str(completedJobs) + '/' + str(totalJobs))
+        time.sleep(interval)
@@ -0,0 +1,160 @@
+#
+# Benchmark the Camunda commands against the mock engine
+#
+# Starts the mock engine in a subprocess, points a temporary config file at it
+# and runs each command with its output discarded.  For every command it
+# reports wall time, the number of REST requests the mock engine received
+# and the peak memory allocated by the client (measured with tracemalloc).
+#
+# Example Usage
+#
+# devops camunda benchmark --instances 100000 --latency 0.002
+# devops camunda benchmark --only historyvolume --json
+#
+# Author: Chris Maeda (cmaeda@cmaeda.com)
+
+import click
+import requests
+import contextlib
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# config module
+from devops.config import camunda_config
+
+# directory that contains the devops package
+MY_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+#
+# scenarios: (name, module, click group, args)
+# mutating commands run last since they change the mock engine's data
+# {resources} and {manifest} are replaced with a generated resource
+# directory and a scratch deploy manifest
+#
+SCENARIOS = [
+    ('deployment count', 'devops.camunda.deployment', 'deployment', ['count']),
+    ('deployment list', 'devops.camunda.deployment', 'deployment', ['list']),
+    ('procdef count', 'devops.camunda.procdef', 'procdef', ['count']),
+    ('procdef list', 'devops.camunda.procdef', 'procdef', ['list']),
+    ('procdef list --showttl', 'devops.camunda.procdef', 'procdef', ['list', '--showttl', 'true']),
+    ('procdef listinstances', 'devops.camunda.procdef', 'procdef', ['listinstances', '-t', 'tenant0']),
+    ('procdef historyvolume', 'devops.camunda.procdef', 'procdef', ['historyvolume']),
+    ('historycleanup getjobs', 'devops.camunda.historycleanup', 'historycleanup', ['getjobs']),
+    ('historycleanup getconfig', 'devops.camunda.historycleanup', 'historycleanup', ['getconfig']),
+    ('historycleanup cleanup', 'devops.camunda.historycleanup', 'historycleanup', ['cleanup']),
+    ('historycleanup jobs retry', 'devops.camunda.historycleanup', 'historycleanup', ['jobs', 'retry', '--interval', '1']),
+    ('procdef sethistoryttl', 'devops.camunda.procdef', 'procdef', ['sethistoryttl', '30', '-t', 'tenant0']),
+    ('deployment deploy', 'devops.camunda.deployment', 'deployment', ['deploy', '{resources}', '--alltenants', '-m', '{manifest}']),
+    ('deployment deploy unchanged', 'devops.camunda.deployment', 'deployment', ['deploy', '{resources}', '--alltenants', '-m', '{manifest}']),
+    ('procdef migrate', 'devops.camunda.procdef', 'procdef', ['migrate', 'process0', '-t', 'tenant1', '--interval', '1']),
+    ('procdef deleteinstances', 'devops.camunda.procdef', 'procdef', ['deleteinstances', '-d', 'dep-tenant0-0']),
+    ('procdef deletehistory', 'devops.camunda.procdef', 'procdef', ['deletehistory', '-t', 'tenant0', '--interval', '1']),
+]
+
+#
+# write some synthetic bpmn files to deploy
+#
+def make_resources(dirname, count):
+    for i in range(count):
+        with open(os.path.join(dirname, 'process' + str(i) + '.bpmn'), 'w') as resource:
+            resource.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                           + '<definitions xmlns="http://www.omg.org/spec/BPMN/20100524/MODEL">\n'
+                           + '  <process id="process' + str(i) + '" isExecutable="true">\n'
+                           + ''.join('    <task id="task' + str(t) + '"/>\n' for t in range(200))
+                           + '  </process>\n</definitions>\n')
+
+def mock_stats(baseurl):
+    resp = requests.get(baseurl + '/mock/stats')
+    if resp.status_code != 200:
+        raise Exception(resp.status_code, resp.text)
+    return json.loads(resp.text)
+
+def start_mock(mockargs):
+    proc = subprocess.Popen([sys.executable, '-m', 'devops.camunda.mockengine', '--port', '0'] + mockargs,
+                            stdout=subprocess.PIPE, text=True, cwd=MY_ROOT)
+    line = proc.stdout.readline()
+    if not line.startswith('Listening on port '):
+        proc.kill()
+        raise Exception('mock engine failed to start', line)
+    return proc, int(line.split()[-1])
+
+#
+# run one scenario and return its measurements
+#
+def run_scenario(baseurl, configfile, module, group, args, scratch):
+    args = [arg.format(**scratch) for arg in args]
+    before = mock_stats(baseurl)
+    tracemalloc.reset_peak()
+    starttime = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        getattr(module, group).main(args + ['--config', configfile], standalone_mode=False)
+    elapsed = time.perf_counter() - starttime
+    peak = tracemalloc.get_traced_memory()[1]
+    after = mock_stats(baseurl)
+    requestsByEndpoint = {}
+    for endpoint in after:
+        delta = after[endpoint] - before.get(endpoint, 0)
+        if delta > 0:
+            requestsByEndpoint[endpoint] = delta
+    return {'seconds': elapsed, 'requests': sum(requestsByEndpoint.values()),
+            'peakBytes': peak, 'endpoints': requestsByEndpoint}
+
+
+@click.command()
+@click.option('--latency', default=0.0, help='seconds the mock engine adds to every request')
+@click.option('--tenants', default=4)
+@click.option('--deployments', default=10, help='deployments per tenant')
+@click.option('--definitions', default=5, help='process definitions per deployment')
+@click.option('--instances', default=100000)
+@click.option('--history', default=100000)
+@click.option('--jobs', default=1000)
+@click.option('--only', help='only run scenarios whose name contains this string')
+@click.option('--json', 'asjson', is_flag=True)
+def benchmark(latency, tenants, deployments, definitions, instances, history, jobs, only, asjson):
+    mockargs = ['--latency', str(latency), '--tenants', str(tenants), '--deployments', str(deployments),
+                '--definitions', str(definitions), '--instances', str(instances),
+                '--history', str(history), '--jobs', str(jobs)]
+    proc, port = start_mock(mockargs)
+    baseurl = 'http://127.0.0.1:' + str(port)
+    configfd, configfile = tempfile.mkstemp(suffix='.config')
+    os.close(configfd)
+    scratchdir = tempfile.TemporaryDirectory()
+    scratch = {'resources': os.path.join(scratchdir.name, 'resources'),
+               'manifest': os.path.join(scratchdir.name, 'manifest.json')}
+    os.mkdir(scratch['resources'])
+    make_resources(scratch['resources'], definitions)
+    res = {}
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            camunda_config.main(['set', baseurl + '/engine-rest', 'demo', 'demo', '--config', configfile],
+                                  standalone_mode=False)
+        scenarios = [s for s in SCENARIOS if only == None or only in s[0]]
+        # import the modules up front so module loading doesn't count as client memory
+        modules = {}
+        for name, modname, group, args in scenarios:
+            modules[modname] = importlib.import_module(modname)
+        tracemalloc.start()
+        for name, modname, group, args in scenarios:
+            res[name] = run_scenario(baseurl, configfile, modules[modname], group, args, scratch)
+            if not asjson:
+                click.echo('%-28s %9.3fs %8d requests %10.1f KiB peak' % (
+                    name, res[name]['seconds'], res[name]['requests'], res[name]['peakBytes'] / 1024.0))
+        tracemalloc.stop()
+    finally:
+        proc.kill()
+        proc.wait()
+        os.remove(configfile)
+        scratchdir.cleanup()
+    if asjson:
+        click.echo(json.dumps(res, indent=2))
+    return res
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,397 @@
+#
+# Camunda REST API
+#
+# Author: Chris Maeda (cmaeda@cmaeda.com)
+
+import click
+from requests.auth import HTTPBasicAuth
+import json
+import hashlib
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# config module
+from devops.config import my_config, readConfig, getKey, withProfile, MY_FILE
+from devops.client import getSession
+from devops.errors import rest_error
+from devops.cache import invalidate_endpoint
+from devops.output import RecordWriter, format_option
+from devops.camunda import aioengine
+from devops.camunda.aioengine import engine_options, run_engine
+
+#
+# REST API Calls
+#
+
+#
+# list deployments for tenantid 
+#
+def deployment_list(tenantId):
+    params = {}
+    if tenantId != None:
+        params['tenantIdIn'] = tenantId
+        
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/deployment'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+    
+    resp = getSession().get(my_url, params=params, auth=HTTPBasicAuth(my_user, my_pass))
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+# See https://docs.camunda.org/manual/7.8/reference/rest/deployment/get-query-count/
+def deployment_count(tenantId):
+    if tenantId != None:
+        params = {'tenantIdIn': tenantId}
+    else:
+        params = {}
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/deployment/count'
+    
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    resp = getSession().get(my_url, params=params, auth=HTTPBasicAuth(my_user, my_pass))
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+#
+# delete a deployment, with its definitions and their instances if doCascade
+#
+def deployment_delete(deploymentId, doCascade, skipListeners, skipIoMappings):
+    params = {}
+    if doCascade == True:
+        params['cascade'] = 'true'
+    if skipListeners == True:
+        params['skipCustomListeners'] = 'true'
+    if skipIoMappings == True:
+        params['skipIoMappings'] = 'true'
+        
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/deployment/' + deploymentId
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+    
+    resp = getSession().delete(my_url, auth=HTTPBasicAuth(my_user, my_pass), params=params)
+    if resp.status_code != 204:
+        raise rest_error(resp)
+    # the deployment's process definitions are gone too
+    invalidate_endpoint('procdef_get')
+
+#
+# multipart/form-data body that streams resource files from disk.
+# The length is computed up front so requests sends a Content-Length
+# instead of falling back to chunked encoding.
+#
+class MultipartStream:
+    def __init__(self, fields, files):
+        self.boundary = uuid.uuid4().hex
+        self.parts = []
+        for name in fields:
+            header = ('--' + self.boundary + '\r\n'
+                      + 'Content-Disposition: form-data; name="' + name + '"\r\n\r\n'
+                      + fields[name] + '\r\n')
+            self.parts.append((header.encode('utf-8'), None))
+        for name in files:
+            header = ('--' + self.boundary + '\r\n'
+                      + 'Content-Disposition: form-data; name="' + name + '"; filename="' + name + '"\r\n'
+                      + 'Content-Type: application/octet-stream\r\n\r\n')
+            self.parts.append((header.encode('utf-8'), files[name]))
+        self.trailer = ('--' + self.boundary + '--\r\n').encode('utf-8')
+
+    def content_type(self):
+        return 'multipart/form-data; boundary=' + self.boundary
+
+    def __len__(self):
+        length = len(self.trailer)
+        for header, pathname in self.parts:
+            length = length + len(header)
+            if pathname != None:
+                length = length + os.path.getsize(pathname) + 2
+        return length
+
+    def __iter__(self):
+        for header, pathname in self.parts:
+            yield header
+            if pathname != None:
+                with open(pathname, 'rb') as resource:
+                    while True:
+                        chunk = resource.read(65536)
+                        if not chunk:
+                            break
+                        yield chunk
+                yield b'\r\n'
+        yield self.trailer
+
+#
+# create a deployment from resource files
+# resources maps resource names to local pathnames
+# See https://docs.camunda.org/manual/7.8/reference/rest/deployment/post-deployment/
+#
+def deployment_create(deploymentName, tenantId, resources, dupFiltering, changedOnly):
+    fields = {'deployment-name': deploymentName, 'deployment-source': 'devops-scripts'}
+    if dupFiltering == True:
+        fields['enable-duplicate-filtering'] = 'true'
+    if changedOnly == True:
+        fields['deploy-changed-only'] = 'true'
+    if tenantId != None:
+        fields['tenant-id'] = tenantId
+    body = MultipartStream(fields, resources)
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/deployment/create'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    headers = {'Content-Type': body.content_type()}
+    resp = getSession().post(my_url, auth=HTTPBasicAuth(my_user, my_pass), data=body, headers=headers)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+#
+# Deploy helpers
+#
+
+RESOURCE_SUFFIXES = ('.bpmn', '.bpmn20.xml', '.dmn', '.dmn11.xml', '.cmmn', '.cmmn11.xml', '.form')
+MANIFEST_FILE = '~/.camunda-deploy-manifest.json'
+
+manifest_lock = threading.Lock()
+
+#
+# find deployable resources under dirname and hash them
+# returns {resource name: (pathname, sha256)}
+#
+def deploy_scan(dirname):
+    res = {}
+    for root, dirs, files in os.walk(dirname):
+        dirs.sort()
+        for filename in sorted(files):
+            if not filename.endswith(RESOURCE_SUFFIXES):
+                continue
+            pathname = os.path.join(root, filename)
+            digest = hashlib.sha256()
+            with open(pathname, 'rb') as resource:
+                while True:
+                    chunk = resource.read(65536)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+            name = os.path.relpath(pathname, dirname).replace(os.sep, '/')
+            res[name] = (pathname, digest.hexdigest())
+    return res
+
+#
+# the manifest records the hash of every resource deployed per engine url,
+# deployment name and tenant.
+# With --profiles several deploys share the file, so every read and update
+# holds manifest_lock.
+#
+def manifest_read(filename):
+    pathname = os.path.expanduser(filename)
+    if not os.path.exists(pathname):
+        return {}
+    with open(pathname) as manifestfile:
+        return json.load(manifestfile)
+
+def manifest_engine(filename, url, deploymentName):
+    with manifest_lock:
+        return manifest_read(filename).get(url, {}).get(deploymentName, {})
+
+#
+# replace the entries of the tenants a deployment was made to on one engine
+# url, keeping what other deploys recorded since manifest_engine
+#
+def manifest_update(filename, url, deploymentName, tenant_manifests):
+    pathname = os.path.expanduser(filename)
+    with manifest_lock:
+        manifest = manifest_read(filename)
+        manifest.setdefault(url, {}).setdefault(deploymentName, {}).update(tenant_manifests)
+        dirname = os.path.dirname(os.path.abspath(pathname))
+        with tempfile.NamedTemporaryFile('w', dir=dirname, prefix=os.path.basename(pathname) + '.',
+                                         suffix='.tmp', delete=False) as manifestfile:
+            json.dump(manifest, manifestfile, indent=2, sort_keys=True)
+        os.replace(manifestfile.name, pathname)
+
+#
+# deploy the resources that changed for one tenant
+#
+def deploy_tenant(deploymentName, tenantId, resources, deployed, force):
+    changed = {}
+    for name in resources:
+        pathname, digest = resources[name]
+        if force or deployed.get(name) != digest:
+            changed[name] = pathname
+    if len(changed) == 0:
+        return None
+    res = deployment_create(deploymentName, tenantId, changed, True, True)
+    res['resourceCount'] = len(changed)
+    return res
+
+#
+# Code to implement the command line interface using the click package.
+# See https://click.palletsprojects.com/en/7.x/
+#
+
+@click.group()
+def deployment():
+    pass
+
+@click.command()
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--tenantid', '-t')
+@engine_options
+def count(config, tenantid, engine, connections):
+    readConfig(config)
+    try:
+        if engine == 'async':
+            res = run_engine(connections, aioengine.deployment_count, tenantid)
+            if res == None:
+                return None
+        else:
+            res = deployment_count(tenantid)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    click.echo('Count ' + str(res))
+    return res
+
+# csv columns and table line for deployments
+DEPLOYMENT_FIELDS = ['id', 'name', 'tenantId', 'deploymentTime', 'source']
+
+def deployment_tableline(adef):
+    def_id = adef['id']
+    def_name = adef['name']
+    def_tid = adef['tenantId']
+    def_date = adef['deploymentTime']
+    return def_name + ':' + def_tid + ' date:' + def_date + ' id:' + def_id
+
+@click.command()
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--tenantid', '-t')
+@format_option
+@engine_options
+def list(config, tenantid, outformat, engine, connections):
+    readConfig(config)
+    try:
+        if engine == 'async':
+            res = run_engine(connections, aioengine.deployment_list, tenantid)
+            if res == None:
+                return None
+        else:
+            res = deployment_list(tenantid)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    writer = RecordWriter(outformat, DEPLOYMENT_FIELDS, deployment_tableline)
+    writer.header('Count ' + str(len(res)))
+    for adef in res:
+        writer.write(adef)
+    writer.close()
+    return res
+
+
+@click.command()
+@click.argument('deploymentid')
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--cascade', default=False)
+@click.option('--skiplisteners', default=True)
+@click.option('--skipio', default=True)
+def delete(deploymentid, config, cascade, skiplisteners, skipio):
+    readConfig(config)
+    try:
+        res = deployment_delete(deploymentid, cascade, skiplisteners, skipio)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    click.echo('Deleted ' + deploymentid)
+    return res
+
+
+#
+# deploy bpmn/dmn resources from a directory to one or more tenants.
+# Resources whose hash matches the local manifest are not uploaded, and the
+# engine's duplicate filtering drops anything else that did not change.
+# Tenants are deployed to concurrently.
+#
+@click.command()
+@click.argument('directory')
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--tenantid', '-t', multiple=True)
+@click.option('--alltenants', is_flag=True, help='deploy to every tenant that has a deployment')
+@click.option('--name', '-n')
+@click.option('--manifest', '-m', default=MANIFEST_FILE)
+@click.option('--workers', '-w', default=8)
+@click.option('--force', is_flag=True, help='ignore the manifest and upload everything')
+def deploy(directory, config, tenantid, alltenants, name, manifest, workers, force):
+    readConfig(config)
+    if name == None:
+        name = os.path.basename(os.path.abspath(directory))
+    resources = deploy_scan(directory)
+    click.echo('Resource Count ' + str(len(resources)))
+    if len(resources) == 0:
+        return None
+
+    tenants = [tid for tid in tenantid]
+    try:
+        if alltenants:
+            for dep in deployment_list(None):
+                if dep['tenantId'] != None and dep['tenantId'] not in tenants:
+                    tenants.append(dep['tenantId'])
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    if len(tenants) == 0:
+        tenants = [None]
+
+    engine_manifest = manifest_engine(manifest, getKey('url'), name)
+    updated = {}
+    res = []
+    deploy_one = withProfile(deploy_tenant)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for tid in tenants:
+            deployed = engine_manifest.get(str(tid), {})
+            futures[tid] = executor.submit(deploy_one, name, tid, resources, deployed, force)
+        for tid in tenants:
+            try:
+                dep = futures[tid].result()
+            except Exception as exc:
+                click.echo('Error: tenant ' + str(tid) + ' rest api returned error ' + str(exc.args))
+                continue
+            # record what the engine now has, even when nothing was uploaded
+            updated[str(tid)] = {rname: resources[rname][1] for rname in resources}
+            if dep == None:
+                click.echo('Unchanged: ' + name + ':' + str(tid))
+                continue
+            defs = dep.get('deployedProcessDefinitions') or {}
+            click.echo('Deployed: ' + name + ':' + str(tid) + ' resources:' + str(dep['resourceCount'])
+                       + ' new definitions:' + str(len(defs)) + ' id:' + dep['id'])
+            res.append(dep)
+    manifest_update(manifest, getKey('url'), name, updated)
+    return res
+
+
+deployment.add_command(count)
+deployment.add_command(list)
+deployment.add_command(delete)
+deployment.add_command(deploy)
+
+if __name__ == '__main__':
+    deployment()
+
+    
+
@@ -0,0 +1,258 @@
+#
+# Camunda REST API
+#
+# Author: Chris Maeda (cmaeda@cmaeda.com)
+
+import click
+from requests.auth import HTTPBasicAuth
+import json
+import re
+
+# config module
+from devops.config import my_config, readConfig, getKey, MY_FILE, MY_SECTION
+from devops.client import getSession
+from devops.errors import rest_error
+from devops.cache import cached
+from devops.output import RecordWriter, format_option, dumps
+from devops.camunda.batch import batch_chunks, batch_wait
+from devops.records import IdList
+from devops.camunda import aioengine
+from devops.camunda.aioengine import engine_options, run_engine
+
+#
+# REST API Calls
+#
+
+# Get history cleanup jobs
+# See https://docs.camunda.org/manual/7.8/reference/rest/history/history-cleanup/get-history-cleanup-jobs/
+def hcleanup_getjobs():
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/job'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+    
+    resp = getSession().get(my_url, auth=HTTPBasicAuth(my_user, my_pass))
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+# Get history cleanup batch window config
+# See https://docs.camunda.org/manual/7.8/reference/rest/history/history-cleanup/get-cleanup-configuration/
+@cached('hcleanup_getconfig', MY_SECTION)
+def hcleanup_getconfig():
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/history/cleanup/configuration'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+    
+    resp = getSession().get(my_url, auth=HTTPBasicAuth(my_user, my_pass))
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+# Schedule a history cleanup
+# See https://docs.camunda.org/manual/7.8/reference/rest/history/history-cleanup/post-history-cleanup/
+# Note: docs say that result is not reliable but we return it anyway
+def hcleanup_schedulejob(now):
+    params = {}
+    if now == False:
+        params['executeAtOnce'] = 'false'
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/history/cleanup'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+    
+    resp = getSession().post(my_url, auth=HTTPBasicAuth(my_user, my_pass), params=params)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+# Query jobs, one page at a time
+# noRetriesLeft selects jobs with retries=0, withException jobs that threw an exception
+# See https://docs.camunda.org/manual/7.8/reference/rest/job/get-query/
+def job_list(procDefId, procDefKey, tenantId, noRetriesLeft, withException, firstResult, maxResults):
+    params = {'firstResult': firstResult, 'maxResults': maxResults,
+              'sortBy': 'jobId', 'sortOrder': 'asc'}
+    if procDefId != None:
+        params['processDefinitionId'] = procDefId
+    if procDefKey != None:
+        params['processDefinitionKey'] = procDefKey
+    if tenantId != None:
+        params['tenantIdIn'] = tenantId
+    if noRetriesLeft == True:
+        params['noRetriesLeft'] = 'true'
+    if withException == True:
+        params['withException'] = 'true'
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/job'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    resp = getSession().get(my_url, auth=HTTPBasicAuth(my_user, my_pass), params=params)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+# Set retries for many jobs at once, returns the batch record
+# See https://docs.camunda.org/manual/7.8/reference/rest/job/post-set-job-retries/
+def job_retries_async(jobIds, retries):
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/job/retries'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    my_data = {'jobIds': jobIds, 'retries': retries}
+
+    headers = {'Content-Type': 'application/json'}
+    resp = getSession().post(my_url, auth=HTTPBasicAuth(my_user, my_pass), data=json.dumps(my_data), headers=headers)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+
+#
+# Code to implement the command line interface using the click package.
+# See https://click.palletsprojects.com/en/7.x/
+#
+
+@click.group()
+def historycleanup():
+    pass
+
+# csv columns for jobs
+JOB_FIELDS = ['id', 'jobDefinitionId', 'processInstanceId', 'processDefinitionId', 'processDefinitionKey',
+              'executionId', 'exceptionMessage', 'retries', 'dueDate', 'suspended', 'priority', 'tenantId']
+
+@click.command()
+@click.option('--config', '-c', default=MY_FILE)
+@format_option
+@engine_options
+def getjobs(config, outformat, engine, connections):
+    readConfig(config)
+    try:
+        if engine == 'async':
+            res = run_engine(connections, aioengine.hcleanup_getjobs)
+            if res == None:
+                return None
+        else:
+            res = hcleanup_getjobs()
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+
+    writer = RecordWriter(outformat, JOB_FIELDS, dumps)
+    writer.header('Found ' + str(len(res)) + ' jobs')
+    for cjob in res:
+        writer.write(cjob)
+    writer.close()
+    return res
+
+
+@click.command()
+@click.option('--config', '-c', default=MY_FILE)
+def getconfig(config):
+    readConfig(config)
+    try:
+        res = hcleanup_getconfig()
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+
+    click.echo('Got Config: ' + json.dumps(res))
+    return res
+
+
+@click.command()
+@click.option('--config', '-c', default=MY_FILE)
+def cleanup(config):
+    readConfig(config)
+    try:
+        # True == run job now
+        res = hcleanup_schedulejob(True)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+
+    click.echo('Got Result: ' + json.dumps(res))
+    return res
+
+
+
+@click.group()
+def jobs():
+    pass
+
+#
+# reset retries on failed jobs with the async job retries batch api.
+# By default only jobs with no retries left are selected; --withexception
+# also picks up jobs that failed but still have retries.
+# --message is a regular expression matched against the exception message.
+#
+@click.command()
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--tenantid', '-t')
+@click.option('--definitionid')
+@click.option('--key', '-k')
+@click.option('--message', '-m')
+@click.option('--withexception', is_flag=True)
+@click.option('--retries', '-r', default=1)
+@click.option('--chunksize', default=1000)
+@click.option('--interval', default=5)
+def retry(config, tenantid, definitionid, key, message, withexception, retries, chunksize, interval):
+    readConfig(config)
+    pattern = None
+    if message != None:
+        try:
+            pattern = re.compile(message)
+        except re.error as exc:
+            click.echo('Error: bad --message pattern ' + str(exc.args))
+            return None
+    try:
+        res = IdList()
+        firstResult = 0
+        while True:
+            page = job_list(definitionid, key, tenantid, not withexception, withexception, firstResult, chunksize)
+            for cjob in page:
+                if pattern != None and (cjob['exceptionMessage'] == None or not pattern.search(cjob['exceptionMessage'])):
+                    continue
+                res.append(cjob['id'])
+            if len(page) < chunksize:
+                break
+            firstResult = firstResult + chunksize
+        click.echo('Failed Job Count ' + str(len(res)))
+
+        batchIds = []
+        for chunk in batch_chunks(res, chunksize):
+            mybatch = job_retries_async(chunk, retries)
+            batchIds.append(mybatch['id'])
+            click.echo('Submitted batch ' + mybatch['id'] + ' jobs:' + str(len(chunk)))
+        failed = batch_wait(batchIds, interval)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    click.echo('Set retries:' + str(retries) + ' on ' + str(len(res)) + ' jobs, failed batch jobs:' + str(failed))
+    return res
+
+
+jobs.add_command(retry)
+
+historycleanup.add_command(getjobs)
+historycleanup.add_command(getconfig)
+historycleanup.add_command(cleanup)
+historycleanup.add_command(jobs)
+
+if __name__ == '__main__':
+    historycleanup()
+
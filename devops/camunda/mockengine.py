@@ -0,0 +1,504 @@
+#
+# Mock Camunda REST Engine
+#
+# A local stand-in for the parts of the Camunda REST API used by the
+# camunda commands, backed by synthetic data.  Records are
+# generated on demand from their index, so a mock engine with millions
+# of instances starts instantly and only deleted ids take up memory.
+#
+# Example Usage
+#
+# devops camunda mockengine --port 8080 --instances 100000 --latency 0.005
+# devops camunda config set http://localhost:8080/engine-rest demo demo
+#
+# Every request is counted per endpoint; GET /mock/stats returns the counts.
+# --errorrate makes that fraction of requests fail with 503 and a
+# Retry-After header before they are applied, to exercise client retries.
+#
+# Author: Chris Maeda (cmaeda@cmaeda.com)
+
+import click
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+#
+# Synthetic engine state
+#
+
+class MockEngine:
+    def __init__(self, tenants, deployments, definitions, instances, history, jobs, batchrate):
+        self.lock = threading.Lock()
+        self.batchrate = batchrate
+        self.counts = {}
+        self.cleanupJobs = 0
+
+        # deployments and definitions are small enough to keep as records
+        self.deployments = []
+        self.definitions = []
+        for t in range(tenants):
+            tenantId = 'tenant' + str(t)
+            for d in range(deployments):
+                depId = 'dep-' + tenantId + '-' + str(d)
+                self.deployments.append({
+                    'id': depId, 'name': 'deployment' + str(d), 'source': 'mockengine',
+                    'tenantId': tenantId, 'deploymentTime': '2018-12-%02dT00:00:00.000+0000' % (d % 28 + 1),
+                })
+                for p in range(definitions):
+                    key = 'process' + str(p)
+                    self.definitions.append({
+                        'id': key + ':' + str(d + 1) + ':' + depId, 'key': key, 'name': key,
+                        'version': d + 1, 'deploymentId': depId, 'tenantId': tenantId,
+                        'historyTimeToLive': None if p % 2 else 30, 'suspended': False,
+                    })
+
+        # instances, history and jobs are spread evenly over the definitions
+        self.instancesPerDef = self.spread(instances)
+        self.historyPerDef = self.spread(history)
+        self.jobsPerDef = self.spread(jobs)
+        self.deletedInstances = set()
+        self.deletedHistory = set()
+        self.retriedJobs = set()
+        self.resources = {}
+        self.batches = {}
+
+    def spread(self, total):
+        n = len(self.definitions)
+        if n == 0:
+            return []
+        return [total // n + (1 if i < total % n else 0) for i in range(n)]
+
+    def count(self, endpoint):
+        with self.lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    #
+    # record factories
+    #
+    def instance(self, defIdx, n):
+        adef = self.definitions[defIdx]
+        return {
+            'id': 'pi-' + str(defIdx) + '-' + str(n), 'definitionId': adef['id'],
+            'businessKey': None, 'caseInstanceId': None, 'ended': False,
+            'suspended': False, 'tenantId': adef['tenantId'], 'links': [],
+        }
+
+    def histInstance(self, defIdx, n):
+        adef = self.definitions[defIdx]
+        return {
+            'id': 'hpi-' + str(defIdx) + '-' + str(n), 'processDefinitionId': adef['id'],
+            'processDefinitionKey': adef['key'], 'processDefinitionVersion': adef['version'],
+            'startTime': '2018-11-01T00:00:00.000+0000', 'endTime': '2018-11-02T00:00:00.000+0000',
+            'state': 'COMPLETED', 'tenantId': adef['tenantId'],
+        }
+
+    # every 10th job has failed, until its retries are reset
+    def job(self, defIdx, n):
+        adef = self.definitions[defIdx]
+        rec = {
+            'id': 'job-' + str(defIdx) + '-' + str(n), 'jobDefinitionId': 'jobdef-' + str(defIdx),
+            'processInstanceId': 'pi-' + str(defIdx) + '-' + str(n), 'processDefinitionId': adef['id'],
+            'processDefinitionKey': adef['key'], 'executionId': 'pi-' + str(defIdx) + '-' + str(n),
+            'exceptionMessage': None, 'retries': 3, 'dueDate': None, 'suspended': False,
+            'priority': 0, 'tenantId': adef['tenantId'],
+        }
+        if n % 10 == 0 and rec['id'] not in self.retriedJobs:
+            rec['retries'] = 0
+            rec['exceptionMessage'] = 'Connection refused: downstream-' + str(defIdx % 3)
+        return rec
+
+    #
+    # queries
+    #
+    def matchDefinitions(self, query):
+        res = []
+        for i, adef in enumerate(self.definitions):
+            if 'tenantIdIn' in query and adef['tenantId'] not in query['tenantIdIn'].split(','):
+                continue
+            if 'deploymentId' in query and adef['deploymentId'] != query['deploymentId']:
+                continue
+            if 'key' in query and adef['key'] != query['key']:
+                continue
+            if 'processDefinitionId' in query and adef['id'] != query['processDefinitionId']:
+                continue
+            if 'processDefinitionKey' in query and adef['key'] != query['processDefinitionKey']:
+                continue
+            res.append(i)
+        return res
+
+    def iterRecords(self, defIdxs, perDef, factory, deleted, skip=0):
+        # skip whole definitions while nothing was deleted so deep pages stay cheap
+        for i in defIdxs:
+            start = 0
+            if len(deleted) == 0:
+                if skip >= perDef[i]:
+                    skip = skip - perDef[i]
+                    continue
+                start = skip
+                skip = 0
+            for n in range(start, perDef[i]):
+                rec = factory(i, n)
+                if rec['id'] in deleted:
+                    continue
+                if skip > 0:
+                    skip = skip - 1
+                    continue
+                yield rec
+
+    def countRecords(self, defIdxs, perDef, deleted, prefix):
+        total = sum(perDef[i] for i in defIdxs)
+        if len(deleted) > 0:
+            defPrefixes = tuple(prefix + str(i) + '-' for i in defIdxs)
+            total = total - sum(1 for rid in deleted if rid.startswith(defPrefixes))
+        return total
+
+    #
+    # batches finish at batchrate items per second and apply their work on completion
+    #
+    def addBatch(self, batchType, ids, onComplete):
+        batchId = str(uuid.uuid4())
+        with self.lock:
+            self.batches[batchId] = {'id': batchId, 'type': batchType, 'ids': ids,
+                                     'created': time.time(), 'onComplete': onComplete}
+        return {'id': batchId, 'type': batchType, 'totalJobs': len(ids), 'batchJobsPerSeed': 100,
+                'invocationsPerBatchJob': 1, 'seedJobDefinitionId': None, 'monitorJobDefinitionId': None,
+                'batchJobDefinitionId': None, 'tenantId': None, 'suspended': False}
+
+    def batchStatistics(self, batchId):
+        with self.lock:
+            batch = self.batches.get(batchId)
+            if batch == None:
+                return []
+            total = len(batch['ids'])
+            completed = min(total, int((time.time() - batch['created']) * self.batchrate))
+            if completed >= total:
+                del self.batches[batchId]
+                batch['onComplete'](batch['ids'])
+                return []
+        return [{'id': batchId, 'type': batch['type'], 'totalJobs': total, 'remainingJobs': total - completed,
+                 'completedJobs': completed, 'failedJobs': 0, 'suspended': False}]
+
+
+#
+# HTTP front end
+#
+
+def page(records, query, skipped=False):
+    first = 0 if skipped else int(query.get('firstResult', 0))
+    maxResults = query.get('maxResults')
+    res = []
+    for i, rec in enumerate(records):
+        if i < first:
+            continue
+        if maxResults != None and len(res) >= int(maxResults):
+            break
+        res.append(rec)
+    return res
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, so without this keep-alive
+    # clients wait out the delayed ack on every request
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body=None, headers={}):
+        data = b'' if body == None else json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def readBody(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length)
+
+    def dispatch(self, method):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path
+        if path == '/mock/stats':
+            with self.server.engine.lock:
+                return self.reply(200, dict(self.server.engine.counts))
+        # strip everything up to /engine/default so any rest base url works
+        pos = path.find('/engine/default/')
+        if pos < 0:
+            return self.reply(404, {'type': 'NotFound', 'message': path})
+        path = path[pos + len('/engine/default'):]
+        for routeMethod, pattern, name, func in ROUTES:
+            if routeMethod != method:
+                continue
+            m = re.fullmatch(pattern, path)
+            if m == None:
+                continue
+            engine = self.server.engine
+            engine.count(method + ' ' + name)
+            if self.server.latency > 0:
+                time.sleep(self.server.latency)
+            body = None
+            if method in ('POST', 'PUT'):
+                body = self.readBody()
+            if random.random() < self.server.errorrate:
+                engine.count('503 ' + method + ' ' + name)
+                return self.reply(503, {'type': 'ServiceUnavailable', 'message': 'injected'}, {'Retry-After': '0'})
+            status, resp = func(engine, query, body, *m.groups())
+            return self.reply(status, resp)
+        self.reply(404, {'type': 'NotFound', 'message': path})
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+#
+# route implementations: func(engine, query, body, *pathargs) -> (status, json)
+#
+
+def matchDeployments(engine, query):
+    return [dep for dep in engine.deployments
+            if 'tenantIdIn' not in query or dep['tenantId'] in query['tenantIdIn'].split(',')]
+
+def deploymentList(engine, query, body):
+    return 200, page(matchDeployments(engine, query), query)
+
+def deploymentCount(engine, query, body):
+    return 200, {'count': len(matchDeployments(engine, query))}
+
+def deploymentDelete(engine, query, body, depId):
+    with engine.lock:
+        for dep in engine.deployments:
+            if dep['id'] == depId:
+                engine.deployments.remove(dep)
+                return 204, None
+    return 404, {'type': 'InvalidRequestException', 'message': 'Deployment ' + depId + ' not found'}
+
+def parseMultipart(body):
+    boundary = body.split(b'\r\n', 1)[0]
+    fields = {}
+    files = {}
+    for part in body.split(boundary)[1:]:
+        if part.startswith(b'--'):
+            break
+        header, content = part[2:].split(b'\r\n\r\n', 1)
+        content = content[:-2]
+        disposition = re.search(r'name="([^"]*)"(; filename="([^"]*)")?', header.decode('utf-8'))
+        if disposition.group(3) != None:
+            files[disposition.group(1)] = content
+        else:
+            fields[disposition.group(1)] = content.decode('utf-8')
+    return fields, files
+
+# new deployments are recorded but do not add synthetic definitions
+def deploymentCreate(engine, query, body):
+    fields, files = parseMultipart(body)
+    name = fields.get('deployment-name')
+    tenantId = fields.get('tenant-id')
+    changed = []
+    with engine.lock:
+        for rname in files:
+            rkey = (tenantId, name, rname)
+            digest = hashlib.sha256(files[rname]).hexdigest()
+            if fields.get('enable-duplicate-filtering') == 'true' and engine.resources.get(rkey) == digest:
+                continue
+            engine.resources[rkey] = digest
+            changed.append(rname)
+        dep = {'id': str(uuid.uuid4()), 'name': name, 'source': fields.get('deployment-source'),
+               'tenantId': tenantId, 'deploymentTime': time.strftime('%Y-%m-%dT%H:%M:%S.000+0000', time.gmtime())}
+        if len(changed) > 0:
+            engine.deployments.append(dep)
+    resp = dict(dep)
+    resp['deployedProcessDefinitions'] = None
+    if len(changed) > 0:
+        resp['deployedProcessDefinitions'] = {rname + ':' + dep['id']: {'resource': rname}
+                                              for rname in changed if rname.endswith('.bpmn')}
+    return 200, resp
+
+def procdefList(engine, query, body):
+    return 200, page((engine.definitions[i] for i in engine.matchDefinitions(query)), query)
+
+def procdefCount(engine, query, body):
+    return 200, {'count': len(engine.matchDefinitions(query))}
+
+def procdefGet(engine, query, body, defId):
+    idxs = engine.matchDefinitions({'processDefinitionId': defId})
+    if len(idxs) == 0:
+        return 404, {'type': 'InvalidRequestException', 'message': 'No matching definition with id ' + defId}
+    return 200, engine.definitions[idxs[0]]
+
+def procdefSetTtl(engine, query, body, defId):
+    idxs = engine.matchDefinitions({'processDefinitionId': defId})
+    if len(idxs) == 0:
+        return 404, {'type': 'InvalidRequestException', 'message': 'No matching definition with id ' + defId}
+    engine.definitions[idxs[0]]['historyTimeToLive'] = json.loads(body)['historyTimeToLive']
+    return 204, None
+
+def procinstList(engine, query, body):
+    records = engine.iterRecords(engine.matchDefinitions(query), engine.instancesPerDef,
+                                 engine.instance, engine.deletedInstances, int(query.get('firstResult', 0)))
+    return 200, page(records, query, True)
+
+def procinstCount(engine, query, body):
+    return 200, {'count': engine.countRecords(engine.matchDefinitions(query), engine.instancesPerDef,
+                                              engine.deletedInstances, 'pi-')}
+
+def procinstDelete(engine, query, body, instId):
+    with engine.lock:
+        engine.deletedInstances.add(instId)
+    return 204, None
+
+def matchJobs(engine, query):
+    for rec in engine.iterRecords(engine.matchDefinitions(query), engine.jobsPerDef, engine.job, ()):
+        if query.get('noRetriesLeft') == 'true' and rec['retries'] != 0:
+            continue
+        if query.get('withException') == 'true' and rec['exceptionMessage'] == None:
+            continue
+        yield rec
+
+def jobList(engine, query, body):
+    return 200, page(matchJobs(engine, query), query)
+
+def jobCount(engine, query, body):
+    return 200, {'count': sum(1 for rec in matchJobs(engine, query))}
+
+def jobRetries(engine, query, body):
+    my_data = json.loads(body)
+    def onComplete(done):
+        engine.retriedJobs.update(done)
+    return 200, engine.addBatch('set-job-retries', my_data['jobIds'], onComplete)
+
+def cleanupConfig(engine, query, body):
+    return 200, {'batchWindowStartTime': None, 'batchWindowEndTime': None}
+
+def cleanupSchedule(engine, query, body):
+    engine.cleanupJobs = engine.cleanupJobs + 1
+    return 200, {'id': 'cleanup-job', 'jobDefinitionId': None, 'dueDate': None, 'processInstanceId': None,
+                 'executionId': None, 'processDefinitionId': None, 'processDefinitionKey': None,
+                 'retries': 3, 'exceptionMessage': None, 'suspended': False, 'priority': 0, 'tenantId': None}
+
+def histProcinstList(engine, query, body):
+    records = engine.iterRecords(engine.matchDefinitions(query), engine.historyPerDef,
+                                 engine.histInstance, engine.deletedHistory, int(query.get('firstResult', 0)))
+    return 200, page(records, query, True)
+
+def histProcinstCount(engine, query, body):
+    return 200, {'count': engine.countRecords(engine.matchDefinitions(query), engine.historyPerDef,
+                                              engine.deletedHistory, 'hpi-')}
+
+# every historic instance has 5 activity instances and 3 variables
+def histActinstCount(engine, query, body):
+    return 200, {'count': 5 * histProcinstCount(engine, query, body)[1]['count']}
+
+def histVarinstCount(engine, query, body):
+    return 200, {'count': 3 * histProcinstCount(engine, query, body)[1]['count']}
+
+def histProcinstDelete(engine, query, body):
+    ids = json.loads(body)['historicProcessInstanceIds']
+    def onComplete(done):
+        engine.deletedHistory.update(done)
+    return 200, engine.addBatch('historic-process-instance-deletion', ids, onComplete)
+
+def migrationGenerate(engine, query, body):
+    my_data = json.loads(body)
+    return 200, {'sourceProcessDefinitionId': my_data['sourceProcessDefinitionId'],
+                 'targetProcessDefinitionId': my_data['targetProcessDefinitionId'],
+                 'instructions': [{'sourceActivityIds': ['task'], 'targetActivityIds': ['task'],
+                                   'updateEventTrigger': my_data.get('updateEventTriggers', False)}]}
+
+# synthetic instances belong to their definition by id, so migrated
+# instances simply disappear from the source definition
+def migrationExecuteAsync(engine, query, body):
+    my_data = json.loads(body)
+    def onComplete(done):
+        engine.deletedInstances.update(done)
+    return 200, engine.addBatch('instance-migration', my_data['processInstanceIds'], onComplete)
+
+def batchStatistics(engine, query, body):
+    return 200, engine.batchStatistics(query.get('batchId'))
+
+ROUTES = [
+    ('GET', r'/deployment', 'deployment', deploymentList),
+    ('GET', r'/deployment/count', 'deployment/count', deploymentCount),
+    ('POST', r'/deployment/create', 'deployment/create', deploymentCreate),
+    ('DELETE', r'/deployment/([^/]+)', 'deployment/{id}', deploymentDelete),
+    ('GET', r'/process-definition', 'process-definition', procdefList),
+    ('GET', r'/process-definition/count', 'process-definition/count', procdefCount),
+    ('GET', r'/process-definition/([^/]+)', 'process-definition/{id}', procdefGet),
+    ('PUT', r'/process-definition/([^/]+)/history-time-to-live', 'process-definition/{id}/history-time-to-live', procdefSetTtl),
+    ('GET', r'/process-instance', 'process-instance', procinstList),
+    ('GET', r'/process-instance/count', 'process-instance/count', procinstCount),
+    ('DELETE', r'/process-instance/([^/]+)', 'process-instance/{id}', procinstDelete),
+    ('GET', r'/job', 'job', jobList),
+    ('GET', r'/job/count', 'job/count', jobCount),
+    ('POST', r'/job/retries', 'job/retries', jobRetries),
+    ('GET', r'/history/cleanup/configuration', 'history/cleanup/configuration', cleanupConfig),
+    ('POST', r'/history/cleanup', 'history/cleanup', cleanupSchedule),
+    ('GET', r'/history/process-instance', 'history/process-instance', histProcinstList),
+    ('GET', r'/history/process-instance/count', 'history/process-instance/count', histProcinstCount),
+    ('POST', r'/history/process-instance/delete', 'history/process-instance/delete', histProcinstDelete),
+    ('GET', r'/history/activity-instance/count', 'history/activity-instance/count', histActinstCount),
+    ('GET', r'/history/variable-instance/count', 'history/variable-instance/count', histVarinstCount),
+    ('POST', r'/migration/generate', 'migration/generate', migrationGenerate),
+    ('POST', r'/migration/executeAsync', 'migration/executeAsync', migrationExecuteAsync),
+    ('GET', r'/batch/statistics', 'batch/statistics', batchStatistics),
+]
+
+class MockServer(ThreadingHTTPServer):
+    # the default listen backlog of 5 drops connects when many clients
+    # (e.g. --engine async) connect at once, and they retry a second later
+    request_queue_size = 1024
+
+#
+# create a mock engine server; port 0 picks a free port
+#
+def make_server(port, latency, tenants, deployments, definitions, instances, history, jobs, batchrate, errorrate=0.0):
+    server = MockServer(('127.0.0.1', port), MockHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.errorrate = errorrate
+    server.engine = MockEngine(tenants, deployments, definitions, instances, history, jobs, batchrate)
+    return server
+
+
+@click.command()
+@click.option('--port', '-p', default=8080)
+@click.option('--latency', default=0.0, help='seconds added to every request')
+@click.option('--tenants', default=4)
+@click.option('--deployments', default=10, help='deployments per tenant')
+@click.option('--definitions', default=5, help='process definitions per deployment')
+@click.option('--instances', default=100000, help='runtime process instances')
+@click.option('--history', default=100000, help='historic process instances')
+@click.option('--jobs', default=1000)
+@click.option('--batchrate', default=10000, help='batch items completed per second')
+@click.option('--errorrate', default=0.0, help='fraction of requests that fail with 503')
+def mockengine(port, latency, tenants, deployments, definitions, instances, history, jobs, batchrate, errorrate):
+    server = make_server(port, latency, tenants, deployments, definitions, instances, history, jobs, batchrate, errorrate)
+    # first line of output is parsed by benchmark.py
+    click.echo('Listening on port ' + str(server.server_address[1]))
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    mockengine()
@@ -0,0 +1,991 @@
+#
+# Camunda REST API
+#
+# Author: Chris Maeda (cmaeda@cmaeda.com)
+
+import click
+import asyncio
+from requests.auth import HTTPBasicAuth
+import json
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# config module
+from devops.config import my_config, readConfig, getKey, withProfile, MY_FILE, MY_SECTION
+from devops.client import getSession
+from devops.errors import rest_error, NotFoundError
+from devops.cache import cached, invalidate
+from devops.output import RecordWriter, format_option, dumps, FORMATS
+from devops.journal import journal_options, journal_check, journal_start, journal_resume, journal_read
+from devops.plan import Plan, plan_options
+from devops.records import record_type, IdList
+from devops.camunda.batch import batch_chunks, batch_wait
+from devops.camunda import aioengine
+from devops.camunda.aioengine import engine_options, run_engine, run_all
+
+# the fields commands keep of the definitions they work through
+ProcdefRecord = record_type('ProcdefRecord', ['id', 'key', 'version', 'tenantId', 'deploymentId'],
+                            interned=['key', 'tenantId', 'deploymentId'])
+
+# instances fetched per request when scanning them for ids
+INSTANCE_PAGE_SIZE = 1000
+
+#
+# REST API Calls
+#
+
+@cached('procdef_get', MY_SECTION)
+def procdef_get(procDefId):
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/process-definition/' + procDefId
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+    
+    resp = getSession().get(my_url, auth=HTTPBasicAuth(my_user, my_pass))
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+
+# set history_time_to_live
+def procdef_set_hittl(procDefId, hittl):
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/process-definition/' + procDefId + '/history-time-to-live'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    my_data = '{"historyTimeToLive":' + str(hittl) + '}'
+    
+    headers = {'Content-Type': 'application/json'}
+    resp = getSession().put(my_url, auth=HTTPBasicAuth(my_user, my_pass), data=my_data, headers=headers)
+    if resp.status_code != 204:
+        raise rest_error(resp)
+    invalidate('procdef_get', MY_SECTION, procDefId)
+
+#
+# list process defs for tenantid and/or deploymentid
+#
+def procdef_list(tenantId, deploymentid, firstResult=None, maxResults=None):
+    params = {}
+    if tenantId != None:
+        params['tenantIdIn'] = tenantId
+    if deploymentid != None:
+        params['deploymentId'] = deploymentid
+    if firstResult != None:
+        params['firstResult'] = firstResult
+    if maxResults != None:
+        params['maxResults'] = maxResults
+        
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/process-definition'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+    
+    resp = getSession().get(my_url, params=params, auth=HTTPBasicAuth(my_user, my_pass))
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+#
+# generator that pages through procdef_list so callers can start
+# working on the first definitions before the whole list is fetched
+#
+def procdef_stream(tenantId, deploymentid, pageSize):
+    firstResult = 0
+    while True:
+        page = procdef_list(tenantId, deploymentid, firstResult, pageSize)
+        for adef in page:
+            yield adef
+        if len(page) < pageSize:
+            return
+        firstResult = firstResult + pageSize
+
+#
+# list all versions of a process definition key
+#
+def procdef_list_bykey(key, tenantId):
+    params = {'key': key, 'sortBy': 'version', 'sortOrder': 'asc'}
+    if tenantId != None:
+        params['tenantIdIn'] = tenantId
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/process-definition'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    resp = getSession().get(my_url, params=params, auth=HTTPBasicAuth(my_user, my_pass))
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+def procdef_count(tenantId, deploymentid=None):
+    if tenantId != None:
+        params = {'tenantIdIn': tenantId}
+    else:
+        params = {}
+    if deploymentid != None:
+        params['deploymentId'] = deploymentid
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/process-definition/count'
+    
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    resp = getSession().get(my_url, params=params, auth=HTTPBasicAuth(my_user, my_pass))
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+#
+# get process instances for process definition, filtered by deployment
+#
+def procinst_for_procdefid(procDefId, deploymentid, firstResult=None, maxResults=None):
+    params = {}
+    if procDefId != None:
+        params['processDefinitionId'] = procDefId
+    if deploymentid != None:
+        params['deploymentId'] = deploymentid
+    if firstResult != None:
+        params['firstResult'] = firstResult
+    if maxResults != None:
+        params['maxResults'] = maxResults
+        # a stable order, so pages don't overlap
+        params['sortBy'] = 'instanceId'
+        params['sortOrder'] = 'asc'
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/process-instance'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+    
+    resp = getSession().get(my_url, auth=HTTPBasicAuth(my_user, my_pass), params=params)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+#
+# count process instances for tenantid and/or deploymentid
+# See https://docs.camunda.org/manual/7.8/reference/rest/process-instance/get-query-count/
+#
+def procinst_count(tenantId, deploymentid):
+    params = {}
+    if tenantId != None:
+        params['tenantIdIn'] = tenantId
+    if deploymentid != None:
+        params['deploymentId'] = deploymentid
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/process-instance/count'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    resp = getSession().get(my_url, auth=HTTPBasicAuth(my_user, my_pass), params=params)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson['count']
+
+#
+# ids of the process instances of a definition, a page at a time
+#
+def procinst_ids(procDefId, deploymentid, pageSize):
+    ids = IdList()
+    firstResult = 0
+    while True:
+        page = procinst_for_procdefid(procDefId, deploymentid, firstResult, pageSize)
+        ids.extend([phist['id'] for phist in page])
+        if len(page) < pageSize:
+            return ids
+        firstResult = firstResult + pageSize
+
+#
+# delete a process instance
+#
+def procinst_delete(procInstId):
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/process-instance/' + procInstId
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+    
+    resp = getSession().delete(my_url, auth=HTTPBasicAuth(my_user, my_pass))
+    if resp.status_code != 204:
+        raise rest_error(resp)
+
+#
+# count historic process instances for a process definition
+# See https://docs.camunda.org/manual/7.8/reference/rest/history/process-instance/get-process-instance-query-count/
+#
+def hist_procinst_count(procDefId):
+    params = {'processDefinitionId': procDefId}
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/history/process-instance/count'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    resp = getSession().get(my_url, auth=HTTPBasicAuth(my_user, my_pass), params=params)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson['count']
+
+#
+# count historic activity instances for a process definition
+# See https://docs.camunda.org/manual/7.8/reference/rest/history/activity-instance/get-activity-instance-query-count/
+#
+def hist_actinst_count(procDefId):
+    params = {'processDefinitionId': procDefId}
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/history/activity-instance/count'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    resp = getSession().get(my_url, auth=HTTPBasicAuth(my_user, my_pass), params=params)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson['count']
+
+#
+# count historic variable instances for a process definition
+# See https://docs.camunda.org/manual/7.8/reference/rest/history/variable-instance/get-variable-instance-query-count/
+#
+def hist_varinst_count(procDefId):
+    params = {'processDefinitionId': procDefId}
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/history/variable-instance/count'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    resp = getSession().get(my_url, auth=HTTPBasicAuth(my_user, my_pass), params=params)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson['count']
+
+#
+# list historic process instances, one page at a time
+# finishedBefore and finishedAfter are camunda dates, see hist_makedate
+# See https://docs.camunda.org/manual/7.8/reference/rest/history/process-instance/get-process-instance-query/
+#
+def hist_procinst_list(procDefId, procDefKey, tenantId, finishedBefore, finishedAfter, firstResult, maxResults):
+    params = {'firstResult': firstResult, 'maxResults': maxResults,
+              'sortBy': 'instanceId', 'sortOrder': 'asc'}
+    if procDefId != None:
+        params['processDefinitionId'] = procDefId
+    if procDefKey != None:
+        params['processDefinitionKey'] = procDefKey
+    if tenantId != None:
+        params['tenantIdIn'] = tenantId
+    if finishedBefore != None:
+        params['finishedBefore'] = finishedBefore
+    if finishedAfter != None:
+        params['finishedAfter'] = finishedAfter
+    if finishedBefore != None or finishedAfter != None:
+        params['finished'] = 'true'
+
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/history/process-instance'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    resp = getSession().get(my_url, auth=HTTPBasicAuth(my_user, my_pass), params=params)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+#
+# delete historic process instances asynchronously, returns the batch record
+# See https://docs.camunda.org/manual/7.8/reference/rest/history/process-instance/post-delete/
+#
+def hist_procinst_delete_async(procInstIds, deleteReason):
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/history/process-instance/delete'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    my_data = {'historicProcessInstanceIds': procInstIds}
+    if deleteReason != None:
+        my_data['deleteReason'] = deleteReason
+
+    headers = {'Content-Type': 'application/json'}
+    resp = getSession().post(my_url, auth=HTTPBasicAuth(my_user, my_pass), data=json.dumps(my_data), headers=headers)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+#
+# generate a migration plan between two process definitions
+# See https://docs.camunda.org/manual/7.8/reference/rest/migration/generate-migration/
+#
+def migration_generate(sourceProcDefId, targetProcDefId, updateEventTriggers):
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/migration/generate'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    my_data = {'sourceProcessDefinitionId': sourceProcDefId,
+               'targetProcessDefinitionId': targetProcDefId,
+               'updateEventTriggers': updateEventTriggers}
+
+    headers = {'Content-Type': 'application/json'}
+    resp = getSession().post(my_url, auth=HTTPBasicAuth(my_user, my_pass), data=json.dumps(my_data), headers=headers)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+#
+# migrate process instances asynchronously, returns the batch record
+# See https://docs.camunda.org/manual/7.8/reference/rest/migration/execute-migration-async/
+#
+def migration_execute_async(migrationPlan, procInstIds, skipListeners, skipIoMappings):
+    my_url = getKey('url')
+    my_url = my_url + '/engine/default/migration/executeAsync'
+
+    my_user = getKey('username')
+    my_pass = getKey('password')
+
+    my_data = {'migrationPlan': migrationPlan,
+               'processInstanceIds': procInstIds,
+               'skipCustomListeners': skipListeners,
+               'skipIoMappings': skipIoMappings}
+
+    headers = {'Content-Type': 'application/json'}
+    resp = getSession().post(my_url, auth=HTTPBasicAuth(my_user, my_pass), data=json.dumps(my_data), headers=headers)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+#
+# convert 'YYYY-mm-DD' into the date format used by camunda query params
+#
+def hist_makedate(day):
+    if day == None:
+        return None
+    date = datetime.datetime.strptime(day, '%Y-%m-%d').astimezone()
+    return date.strftime('%Y-%m-%dT%H:%M:%S.000%z')
+
+#
+# gather history table counts and ttl for one process definition
+#
+def procdef_history_volume(adef):
+    def_id = adef['id']
+    if 'historyTimeToLive' in adef:
+        def_hittl = adef['historyTimeToLive']
+    else:
+        def_hittl = procdef_get(def_id)['historyTimeToLive']
+    volume = {
+        'id': def_id,
+        'key': adef['key'],
+        'version': adef['version'],
+        'tenantId': adef.get('tenantId'),
+        'historyTimeToLive': def_hittl,
+        'processInstances': hist_procinst_count(def_id),
+        'activityInstances': hist_actinst_count(def_id),
+        'variableInstances': hist_varinst_count(def_id),
+    }
+    volume['total'] = volume['processInstances'] + volume['activityInstances'] + volume['variableInstances']
+    return volume
+
+#
+# procdef_history_volume for every definition, with the three counts of a
+# definition made at the same time
+#
+async def history_volumes_async(client, tenantid, deploymentid, connections):
+    async def history_volume(adef):
+        def_id = adef['id']
+        if 'historyTimeToLive' in adef:
+            def_hittl = adef['historyTimeToLive']
+        else:
+            def_hittl = (await aioengine.procdef_get(client, def_id))['historyTimeToLive']
+        counts = await asyncio.gather(aioengine.hist_count(client, 'process-instance', def_id),
+                                      aioengine.hist_count(client, 'activity-instance', def_id),
+                                      aioengine.hist_count(client, 'variable-instance', def_id))
+        volume = {
+            'id': def_id,
+            'key': adef['key'],
+            'version': adef['version'],
+            'tenantId': adef.get('tenantId'),
+            'historyTimeToLive': def_hittl,
+            'processInstances': counts[0],
+            'activityInstances': counts[1],
+            'variableInstances': counts[2],
+        }
+        volume['total'] = sum(counts)
+        return volume
+
+    res = await aioengine.procdef_list(client, tenantid, deploymentid)
+    return await run_all(history_volume, res, connections)
+
+#
+# Code to implement the command line interface using the click package.
+# See https://click.palletsprojects.com/en/7.x/
+#
+
+@click.group()
+def procdef():
+    pass
+
+@click.command()
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--tenantid', '-t')
+@engine_options
+def count(config, tenantid, engine, connections):
+    readConfig(config)
+    try:
+        if engine == 'async':
+            res = run_engine(connections, aioengine.procdef_count, tenantid, None)
+            if res == None:
+                return None
+        else:
+            res = procdef_count(tenantid)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    click.echo('Count ' + str(res))
+    return res
+
+# csv columns and table lines for process definitions and instances
+PROCDEF_FIELDS = ['id', 'key', 'name', 'version', 'deploymentId', 'tenantId', 'historyTimeToLive', 'suspended']
+PROCINST_FIELDS = ['id', 'definitionId', 'businessKey', 'caseInstanceId', 'ended', 'suspended', 'tenantId']
+
+def procdef_tableline(adef):
+    return adef['key'] + ':' + str(adef['version']) + ' id:' + adef['id']
+
+def procdef_ttlline(adef):
+    return procdef_tableline(adef) + ' ttl:' + str(adef['historyTimeToLive'])
+
+@click.command()
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--tenantid', '-t')
+@click.option('--deploymentid', '-d')
+@click.option('--showttl')
+@format_option
+@engine_options
+def list(config, tenantid, deploymentid, showttl, outformat, engine, connections):
+    readConfig(config)
+    try:
+        if engine == 'async':
+            res = run_engine(connections, procdef_list_async, tenantid, deploymentid, showttl, connections)
+            if res == None:
+                return None
+        else:
+            res = procdef_list(tenantid, deploymentid)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    writer = RecordWriter(outformat, PROCDEF_FIELDS, procdef_ttlline if showttl != None else procdef_tableline)
+    writer.header('Count ' + str(len(res)))
+    for adef in res:
+        if showttl != None and engine != 'async':
+            my_procdef = procdef_get(adef['id'])
+            adef['historyTimeToLive'] = my_procdef['historyTimeToLive']
+        writer.write(adef)
+    writer.close()
+    return res
+
+# the definitions, with their ttl fetched at the same time for --showttl
+async def procdef_list_async(client, tenantid, deploymentid, showttl, connections):
+    async def get_ttl(adef):
+        adef['historyTimeToLive'] = (await aioengine.procdef_get(client, adef['id']))['historyTimeToLive']
+
+    res = await aioengine.procdef_list(client, tenantid, deploymentid)
+    if showttl != None:
+        await run_all(get_ttl, res, connections)
+    return res
+
+
+@click.command()
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--tenantid', '-t')
+@click.option('--deploymentid', '-d')
+@format_option
+@engine_options
+def listinstances(config, tenantid, deploymentid, outformat, engine, connections):
+    readConfig(config)
+    if engine == 'async':
+        return run_engine(connections, listinstances_async, tenantid, deploymentid, outformat, connections)
+    try:
+        res = procdef_list(tenantid, deploymentid)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    writer = RecordWriter(outformat, PROCINST_FIELDS, dumps)
+    writer.header('Count ' + str(len(res)))
+    for adef in res:
+        def_id = adef['id']
+        def_key = adef['key']
+        def_vers = adef['version']
+
+        my_history = procinst_for_procdefid(def_id, deploymentid)
+
+        writer.header(def_key + ':' + str(def_vers) + ' id:' + def_id + ' instances:' + str(len(my_history)))
+
+        for phist in my_history:
+            writer.write(phist)
+    writer.close()
+    return res
+
+#
+# the instances of --connections definitions are listed at the same time,
+# then written in definition order before the next definitions are listed
+#
+async def listinstances_async(client, tenantid, deploymentid, outformat, connections):
+    histories = {}
+
+    async def list_instances(adef):
+        histories[adef['id']] = await aioengine.procinst_list(client, adef['id'], deploymentid)
+
+    try:
+        res = await aioengine.procdef_list(client, tenantid, deploymentid)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    writer = RecordWriter(outformat, PROCINST_FIELDS, dumps)
+    writer.header('Count ' + str(len(res)))
+    for start in range(0, len(res), connections):
+        window = res[start:start + connections]
+        try:
+            await run_all(list_instances, window, connections)
+        except Exception as exc:
+            writer.close()
+            click.echo('Error: rest api returned error ' + str(exc.args))
+            return None
+        for adef in window:
+            my_history = histories.pop(adef['id'])
+            writer.header(adef['key'] + ':' + str(adef['version']) + ' id:' + adef['id'] + ' instances:' + str(len(my_history)))
+            for phist in my_history:
+                writer.write(phist)
+    writer.close()
+    return res
+
+
+#
+# delete process instances
+# with --journal the instance ids and each deletion are recorded so that
+# --resume can finish an interrupted run without listing the instances again
+#
+@click.command()
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--tenantid', '-t')
+@click.option('--deploymentid', '-d')
+@click.option('--pagesize', default=INSTANCE_PAGE_SIZE, help='instances to list per request')
+@journal_options
+@plan_options
+@engine_options
+def deleteinstances(config, tenantid, deploymentid, pagesize, journal, resume, overwrite, plan, planrate, engine, connections):
+    readConfig(config)
+    if plan:
+        return deleteinstances_plan(tenantid, deploymentid, pagesize, journal, resume, planrate)
+    if journal != None and not resume:
+        try:
+            journal_check(journal, overwrite)
+        except Exception as exc:
+            click.echo('Error: cannot start journal ' + str(exc.args))
+            return None
+    if engine == 'async':
+        return run_engine(connections, deleteinstances_async, tenantid, deploymentid, pagesize, journal, resume, overwrite, connections)
+    jnl = None
+    if resume:
+        if journal == None:
+            click.echo('Must specify --journal option with --resume')
+            return None
+        try:
+            jnl = journal_resume(journal, 'procdef deleteinstances')
+        except Exception as exc:
+            click.echo('Error: cannot resume ' + str(exc.args))
+            return None
+        ids = jnl.pending()
+        click.echo('Resuming Instance Count ' + str(len(ids)))
+    else:
+        try:
+            res = [ProcdefRecord.from_json(adef) for adef in procdef_list(tenantid, deploymentid)]
+        except Exception as exc:
+            click.echo('Error: rest api returned error ' + str(exc.args))
+            return None
+        click.echo('Count ' + str(len(res)))
+        ids = IdList()
+        for adef in res:
+            def_id = adef['id']
+            def_key = adef['key']
+            def_vers = adef['version']
+
+            my_history = procinst_ids(def_id, deploymentid, pagesize)
+
+            click.echo(def_key + ':' + str(def_vers) + ' id:' + def_id + ' history:' + str(len(my_history)))
+            ids.extend(my_history)
+        if journal != None:
+            params = {'tenantid': tenantid, 'deploymentid': deploymentid}
+            try:
+                jnl = journal_start(journal, 'procdef deleteinstances', params, ids.tolist(), overwrite)
+            except Exception as exc:
+                click.echo('Error: cannot start journal ' + str(exc.args))
+                return None
+
+    for procinst_id in ids:
+        try:
+            procinst_delete(procinst_id)
+            click.echo('Deleted ' + procinst_id)
+        except Exception as exc:
+            if resume and exc.args[0] == 404:
+                # deleted just before the interrupted run could record it
+                click.echo('Already deleted ' + procinst_id)
+            else:
+                click.echo('Error: rest api returned error ' + str(exc.args))
+                if jnl != None:
+                    jnl.close()
+                return None
+        if jnl != None:
+            jnl.done(procinst_id)
+    if jnl != None:
+        jnl.compact()
+    return ids
+
+#
+# --engine async: the instance lists of all definitions are fetched at the
+# same time, then all the deletes, with up to connections calls in flight.
+# The deletes only start once every id is listed, as they would shift the
+# later pages of the lists.
+#
+async def deleteinstances_async(client, tenantid, deploymentid, pagesize, journal, resume, overwrite, connections):
+    jnl = None
+    if resume:
+        if journal == None:
+            click.echo('Must specify --journal option with --resume')
+            return None
+        try:
+            jnl = journal_resume(journal, 'procdef deleteinstances')
+        except Exception as exc:
+            click.echo('Error: cannot resume ' + str(exc.args))
+            return None
+        ids = jnl.pending()
+        click.echo('Resuming Instance Count ' + str(len(ids)))
+    else:
+        async def list_instances(adef):
+            my_history = await aioengine.procinst_ids(client, adef['id'], deploymentid, pagesize)
+            click.echo(adef['key'] + ':' + str(adef['version']) + ' id:' + adef['id'] + ' history:' + str(len(my_history)))
+            return my_history
+
+        try:
+            res = [ProcdefRecord.from_json(adef) for adef in await aioengine.procdef_list(client, tenantid, deploymentid)]
+            click.echo('Count ' + str(len(res)))
+            ids = IdList()
+            for my_history in await run_all(list_instances, res, connections):
+                ids.extend(my_history)
+        except Exception as exc:
+            click.echo('Error: rest api returned error ' + str(exc.args))
+            return None
+        if journal != None:
+            params = {'tenantid': tenantid, 'deploymentid': deploymentid}
+            try:
+                jnl = journal_start(journal, 'procdef deleteinstances', params, ids.tolist(), overwrite)
+            except Exception as exc:
+                click.echo('Error: cannot start journal ' + str(exc.args))
+                return None
+
+    async def delete_instance(procinst_id):
+        try:
+            await aioengine.procinst_delete(client, procinst_id)
+            click.echo('Deleted ' + procinst_id)
+        except NotFoundError:
+            if not resume:
+                raise
+            # deleted just before the interrupted run could record it
+            click.echo('Already deleted ' + procinst_id)
+        if jnl != None:
+            jnl.done(procinst_id)
+
+    try:
+        await run_all(delete_instance, ids, connections)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        if jnl != None:
+            jnl.close()
+        return None
+    if jnl != None:
+        jnl.compact()
+    return ids
+
+#
+# instance lists of pagesize per definition, then one delete per instance.
+# The instance ids are all held until the deletes start, packed unless
+# they are journaled.
+#
+def deleteinstances_plan(tenantid, deploymentid, pagesize, journal, resume, planrate):
+    pln = Plan('procdef deleteinstances', 'camunda', planrate)
+    if resume:
+        if journal == None:
+            click.echo('Must specify --journal option with --resume')
+            return None
+        try:
+            pln.records = len(journal_read(journal, 'procdef deleteinstances').pending())
+        except Exception as exc:
+            click.echo('Error: cannot resume ' + str(exc.args))
+            return None
+    else:
+        try:
+            definitions = pln.query(procdef_count, tenantid, deploymentid)['count']
+            pln.records = pln.query(procinst_count, tenantid, deploymentid)
+        except Exception as exc:
+            click.echo('Error: rest api returned error ' + str(exc.args))
+            return None
+        pln.calls('GET /engine/default/process-definition', 1)
+        # a last, partly filled page per definition
+        pln.calls('GET /engine/default/process-instance', definitions + pln.records // pagesize)
+        pln.hold('definition record', definitions)
+        pln.hold('instance', min(pagesize, pln.records))
+    pln.calls('DELETE /engine/default/process-instance/{id}', pln.records)
+    pln.hold('id' if journal != None else 'packed id', pln.records)
+    pln.echo()
+    return pln.records
+
+
+@click.command()
+@click.argument('ttl')
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--tenantid', '-t')
+@click.option('--deploymentid', '-d')
+@engine_options
+def sethistoryttl(ttl, config, tenantid, deploymentid, engine, connections):
+    readConfig(config)
+    if engine == 'async':
+        return run_engine(connections, sethistoryttl_async, ttl, tenantid, deploymentid, connections)
+    try:
+        res = procdef_list(tenantid, deploymentid)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    click.echo('Count ' + str(len(res)))
+    for adef in res:
+        def_id = adef['id']
+        def_key = adef['key']
+        def_vers = adef['version']
+        procdef_set_hittl(def_id, ttl)
+        click.echo('Updated:' + def_key + ':' + str(def_vers) + ' ttl:' + str(ttl) + ' id:' + def_id)
+    return res
+
+async def sethistoryttl_async(client, ttl, tenantid, deploymentid, connections):
+    async def set_ttl(adef):
+        await aioengine.procdef_set_hittl(client, adef['id'], ttl)
+        click.echo('Updated:' + adef['key'] + ':' + str(adef['version']) + ' ttl:' + str(ttl) + ' id:' + adef['id'])
+
+    try:
+        res = await aioengine.procdef_list(client, tenantid, deploymentid)
+        click.echo('Count ' + str(len(res)))
+        await run_all(set_ttl, res, connections)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    return res
+
+
+# csv columns and table line for historyvolume
+VOLUME_FIELDS = ['id', 'key', 'version', 'tenantId', 'historyTimeToLive',
+                 'processInstances', 'activityInstances', 'variableInstances', 'total']
+
+def volume_tableline(vol):
+    return '%10d %10d %10d %10d %6s  %s:%s id:%s' % (
+        vol['total'], vol['processInstances'], vol['activityInstances'], vol['variableInstances'],
+        str(vol['historyTimeToLive']), vol['key'], str(vol['version']), vol['id'])
+
+#
+# rank process definitions by the amount of history they keep in the engine db.
+# Definitions without a ttl are never touched by history cleanup, so a big
+# total with ttl:None is the first candidate for sethistoryttl.
+#
+@click.command()
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--tenantid', '-t')
+@click.option('--deploymentid', '-d')
+@click.option('--workers', '-w', default=8)
+@click.option('--pagesize', default=100)
+@click.option('--top', default=0, help='only show the N largest definitions')
+@click.option('--format', 'outformat', type=click.Choice(FORMATS + ['json']), default='table')
+@engine_options
+def historyvolume(config, tenantid, deploymentid, workers, pagesize, top, outformat, engine, connections):
+    readConfig(config)
+    try:
+        if engine == 'async':
+            res = run_engine(connections, history_volumes_async, tenantid, deploymentid, connections)
+            if res == None:
+                return None
+        else:
+            history_volume = withProfile(procdef_history_volume)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # submit count queries while the definition list is still being paged in
+                futures = [executor.submit(history_volume, adef)
+                           for adef in procdef_stream(tenantid, deploymentid, pagesize)]
+                res = [future.result() for future in futures]
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    res.sort(key=lambda vol: vol['total'], reverse=True)
+    if top > 0:
+        res = res[:top]
+
+    if outformat == 'json':
+        click.echo(json.dumps(res, indent=2))
+        return res
+
+    writer = RecordWriter(outformat, VOLUME_FIELDS, volume_tableline)
+    writer.header('Count ' + str(len(res)))
+    writer.header('%10s %10s %10s %10s %6s  %s' % ('total', 'procinst', 'actinst', 'varinst', 'ttl', 'definition'))
+    for vol in res:
+        writer.write(vol)
+    writer.close()
+    return res
+
+
+#
+# delete historic process instances with the async historic deletion batch api.
+# The matching ids are collected first, because the engine starts deleting as
+# soon as the first batch is submitted and that would shift later pages.
+#
+@click.command()
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--tenantid', '-t')
+@click.option('--deploymentid', '-d')
+@click.option('--definitionid')
+@click.option('--key', '-k')
+@click.option('--before', help='finished before YYYY-mm-DD')
+@click.option('--since', '--after', help='finished on or after YYYY-mm-DD')
+@click.option('--reason', default='devops deletehistory')
+@click.option('--chunksize', default=1000)
+@click.option('--interval', default=5)
+def deletehistory(config, tenantid, deploymentid, definitionid, key, before, since, reason, chunksize, interval):
+    if tenantid == None and deploymentid == None and definitionid == None and key == None and before == None:
+        click.echo('Must specify at least one of --tenantid, --deploymentid, --definitionid, --key or --before')
+        return None
+    readConfig(config)
+    finishedBefore = hist_makedate(before)
+    finishedAfter = hist_makedate(since)
+    starttime = time.time()
+    try:
+        if deploymentid != None:
+            # history queries have no deployment filter, go through its definitions
+            procDefIds = [adef['id'] for adef in procdef_list(tenantid, deploymentid)]
+        else:
+            procDefIds = [definitionid]
+        res = IdList()
+        for procDefId in procDefIds:
+            firstResult = 0
+            while True:
+                page = hist_procinst_list(procDefId, key, tenantid, finishedBefore, finishedAfter, firstResult, chunksize)
+                for phist in page:
+                    res.append(phist['id'])
+                if len(page) < chunksize:
+                    break
+                firstResult = firstResult + chunksize
+        click.echo('Historic Instance Count ' + str(len(res)))
+
+        batchIds = []
+        for chunk in batch_chunks(res, chunksize):
+            mybatch = hist_procinst_delete_async(chunk, reason)
+            batchIds.append(mybatch['id'])
+            click.echo('Submitted batch ' + mybatch['id'] + ' instances:' + str(len(chunk)))
+        failed = batch_wait(batchIds, interval)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    elapsed = time.time() - starttime
+    click.echo('Deleted ' + str(len(res)) + ' historic instances in ' + str(round(elapsed, 1)) + 's'
+               + ' (' + str(round(len(res) / max(elapsed, 0.001), 1)) + ' instances/s) failed jobs:' + str(failed))
+    return res
+
+
+#
+# migrate the instances of every old version of a process definition key
+# to the latest version (per tenant), using generated migration plans and
+# async migration batches of at most chunksize instances.
+# Old deployments without instances can then be deleted cheaply.
+#
+@click.command()
+@click.argument('key')
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--tenantid', '-t')
+@click.option('--chunksize', default=500)
+@click.option('--interval', default=5)
+@click.option('--skiplisteners', default=True)
+@click.option('--skipio', default=True)
+@click.option('--updateeventtriggers', is_flag=True)
+def migrate(key, config, tenantid, chunksize, interval, skiplisteners, skipio, updateeventtriggers):
+    readConfig(config)
+    try:
+        res = [ProcdefRecord.from_json(adef) for adef in procdef_list_bykey(key, tenantid)]
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    click.echo('Count ' + str(len(res)))
+
+    # versions are numbered per tenant, so find the latest one for each tenant
+    latest = {}
+    for adef in res:
+        def_tid = adef.get('tenantId')
+        if def_tid not in latest or adef['version'] > latest[def_tid]['version']:
+            latest[def_tid] = adef
+
+    batchIds = []
+    migrated = 0
+    try:
+        for adef in res:
+            target = latest[adef.get('tenantId')]
+            if adef['id'] == target['id']:
+                continue
+            procInstIds = procinst_ids(adef['id'], None, INSTANCE_PAGE_SIZE)
+            if len(procInstIds) == 0:
+                continue
+            plan = migration_generate(adef['id'], target['id'], updateeventtriggers)
+            for chunk in batch_chunks(procInstIds, chunksize):
+                mybatch = migration_execute_async(plan, chunk, skiplisteners, skipio)
+                batchIds.append(mybatch['id'])
+            migrated = migrated + len(procInstIds)
+            click.echo('Migrating ' + key + ':' + str(adef['version']) + ' -> ' + str(target['version'])
+                       + ' instances:' + str(len(procInstIds)) + ' id:' + adef['id'])
+        failed = batch_wait(batchIds, interval)
+    except Exception as exc:
+        click.echo('Error: rest api returned error ' + str(exc.args))
+        return None
+    click.echo('Migrated ' + str(migrated) + ' instances in ' + str(len(batchIds)) + ' batches, failed batch jobs:' + str(failed))
+    return res
+
+
+procdef.add_command(count)
+procdef.add_command(list)
+procdef.add_command(sethistoryttl)
+procdef.add_command(listinstances)
+procdef.add_command(deleteinstances)
+procdef.add_command(historyvolume)
+procdef.add_command(deletehistory)
+procdef.add_command(migrate)
+
+if __name__ == '__main__':
+    procdef()
+
+    
+
@@ -0,0 +1,189 @@
+#
+# devops command line
+#
+# One entry point for all the OpsGenie and Camunda commands:
+#
+# devops opsgenie alerts count -s open
+# devops camunda procdef list -t tenant0
+#
+# Subcommand modules are only imported when the command is actually run,
+# so help and light commands don't pay for importing requests and the
+# other command modules.
+#
+# The opsgenie and camunda groups select config profiles:
+#
+# devops camunda --profile prod procdef count
+# devops camunda --profiles prod,staging procdef count
+# devops opsgenie --all-profiles alerts count -s open
+#
+# --stats prints a per-endpoint summary of the REST calls a command made
+# and --trace appends one JSON line per call to a file:
+#
+# devops --stats --trace calls.ndjson camunda procdef historyvolume
+#
+# Repeated GETs of definitions, heartbeats and alerts are cached in memory;
+# --cache-dir keeps them on disk so a script of commands can share them:
+#
+# devops --cache-dir ~/.cache/devops opsgenie heartbeat status prod-
+#
+# Author: Chris Maeda (cmaeda@cmaeda.com)
+
+import click
+import importlib
+
+# config module
+from devops.config import readConfig, getProfiles, useProfile, OPSGENIE_FILE, OPSGENIE_SECTION, MY_FILE, MY_SECTION
+from devops.profiles import run_profiles, echo_report
+from devops.stats import enable_stats, echo_stats, write_stats_json, add_hook, remove_hook, TraceWriter
+from devops.cache import use_disk_cache, disable_cache
+from devops.retry import set_retries, MAX_RETRIES
+
+#
+# click group whose subcommands are named by 'module:attribute' strings
+# lazy_commands maps name -> (import path, short help)
+#
+class LazyGroup(click.Group):
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted(super().list_commands(ctx) + [name for name in self.lazy_commands])
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_commands:
+            modname, attr = self.lazy_commands[cmd_name][0].split(':')
+            return getattr(importlib.import_module(modname), attr)
+        return super().get_command(ctx, cmd_name)
+
+    # use the short help from lazy_commands so --help imports nothing
+    def format_commands(self, ctx, formatter):
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.lazy_commands:
+                rows.append((name, self.lazy_commands[name][1]))
+            else:
+                cmd = self.get_command(ctx, name)
+                rows.append((name, cmd.get_short_help_str()))
+        if len(rows) > 0:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
+
+#
+# lazy group that runs its subcommand once per selected profile.
+# section and config_file name the service's config section and default file,
+# used to find the profiles for --all-profiles.
+#
+class ProfileGroup(LazyGroup):
+    def __init__(self, *args, section=None, config_file=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.section = section
+        self.config_file = config_file
+
+    # keep the subcommand's own args so they can be replayed for each profile
+    def parse_args(self, ctx, args):
+        all_args = [arg for arg in args]
+        rest = super().parse_args(ctx, args)
+        ctx.meta['devops.subargs'] = all_args[len(all_args) - len(rest) - 1:]
+        return rest
+
+    def invoke(self, ctx):
+        profiles = ctx.params.get('profiles')
+        subargs = ctx.meta.get('devops.subargs', [])
+        if ctx.params.get('all_profiles'):
+            readConfig(subcommand_config(subargs, self.config_file))
+            profiles = ','.join(getProfiles(self.section))
+        if profiles == None or len(subargs) == 0 or '--help' in subargs:
+            with useProfile(ctx.params.get('profile')):
+                return super().invoke(ctx)
+
+        def run():
+            cmd_name, cmd, args = self.resolve_command(ctx, [arg for arg in subargs])
+            with cmd.make_context(cmd_name, args, parent=ctx) as sub_ctx:
+                return sub_ctx.command.invoke(sub_ctx)
+
+        results = run_profiles(profiles.split(','), ctx.params.get('workers'), run)
+        echo_report(results)
+        return {profile: res for profile, res, text, error, raw in results}
+
+#
+# find the --config value passed to the subcommand, if any
+#
+def subcommand_config(subargs, default):
+    for i, arg in enumerate(subargs):
+        if arg in ('--config', '-c') and i + 1 < len(subargs):
+            return subargs[i + 1]
+        if arg.startswith('--config='):
+            return arg[len('--config='):]
+    return default
+
+def profile_options(func):
+    func = click.option('--workers', default=8, help='profiles to run at the same time')(func)
+    func = click.option('--all-profiles', is_flag=True, help='run against every profile in the config file')(func)
+    func = click.option('--profiles', help='comma separated profiles to run against')(func)
+    func = click.option('--profile', '-p', help='config profile to use')(func)
+    return func
+
+
+@click.group(cls=ProfileGroup, section=OPSGENIE_SECTION, config_file=OPSGENIE_FILE, lazy_commands={
+    'config': ('devops.config:opsgenie_config', 'Show or set the OpsGenie API key.'),
+    'alerts': ('devops.opsgenie.alerts:alerts', 'Count, list, close and delete alerts in bulk.'),
+    'heartbeat': ('devops.opsgenie.heartbeat:heartbeat', 'List, check and update heartbeats in bulk.'),
+})
+@profile_options
+def opsgenie(profile, profiles, all_profiles, workers):
+    """OpsGenie alerts and heartbeats."""
+    pass
+
+@click.group(cls=ProfileGroup, section=MY_SECTION, config_file=MY_FILE, lazy_commands={
+    'config': ('devops.config:camunda_config', 'Show or set the Camunda REST engine url.'),
+    'deployment': ('devops.camunda.deployment:deployment', 'Count, list, deploy and delete deployments.'),
+    'procdef': ('devops.camunda.procdef:procdef', 'Process definitions, their instances and history.'),
+    'historycleanup': ('devops.camunda.historycleanup:historycleanup', 'History cleanup and failed jobs.'),
+    'mockengine': ('devops.camunda.mockengine:mockengine', 'Run a mock Camunda REST engine.'),
+    'benchmark': ('devops.camunda.benchmark:benchmark', 'Benchmark the commands against the mock engine.'),
+})
+@profile_options
+def camunda(profile, profiles, all_profiles, workers):
+    """Camunda REST engine administration."""
+    pass
+
+@click.group()
+@click.option('--stats', 'showstats', is_flag=True, help='print per-endpoint request stats to stderr')
+@click.option('--stats-json', 'statsjson', type=click.Path(dir_okay=False), help='write per-endpoint request stats as JSON to this file')
+@click.option('--trace', type=click.Path(dir_okay=False), help='append a JSON line per request to this file')
+@click.option('--cache-dir', type=click.Path(file_okay=False), help='also cache responses on disk in this directory')
+@click.option('--no-cache', is_flag=True, help='always fetch from the server')
+@click.option('--retries', default=MAX_RETRIES, help='retries of a failed or rate limited request, 0 to fail fast')
+@click.pass_context
+def devops(ctx, showstats, statsjson, trace, cache_dir, no_cache, retries):
+    set_retries(retries)
+    if no_cache:
+        disable_cache()
+    elif cache_dir != None:
+        use_disk_cache(cache_dir)
+    if showstats or statsjson != None:
+        enable_stats()
+    if showstats:
+        ctx.call_on_close(echo_stats)
+    if statsjson != None:
+        ctx.call_on_close(lambda: write_stats_json(statsjson))
+    if trace != None:
+        writer = TraceWriter(trace)
+        add_hook(writer)
+        ctx.call_on_close(lambda: trace_close(writer))
+
+# stop tracing before the file is closed
+def trace_close(writer):
+    remove_hook(writer)
+    writer.close()
+
+
+devops.add_command(opsgenie)
+devops.add_command(camunda)
+
+def main():
+    devops()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#
+# devops rest client
+#
+# Pooled HTTP sessions for the REST wrappers.  Each profile gets its own
+# requests.Session so connections to one engine or account are reused
+# and profiles running side by side don't share a connection pool.
+#
+# Every request goes through InstrumentedAdapter, which retries it as
+# described in devops.retry and passes each attempt to the hooks in
+# devops.stats (--stats and --trace) once they are enabled.
+#
+
+import requests
+import threading
+import time
+
+# config module
+from devops.config import getProfile
+from devops import stats
+from devops.retry import send_with_retry
+
+POOL_SIZE = 32
+
+my_sessions = {}
+my_lock = threading.Lock()
+
+
+class InstrumentedAdapter(requests.adapters.HTTPAdapter):
+    def send(self, request, **kwargs):
+        return send_with_retry(request, lambda req: self.send_once(req, **kwargs))
+
+    def send_once(self, request, **kwargs):
+        if not stats.hooks_enabled():
+            return super().send(request, **kwargs)
+        start = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+            # read the body here so latency and size cover the whole response
+            response.content
+        except Exception as exc:
+            stats.dispatch(request, None, time.perf_counter() - start, exc)
+            raise
+        stats.dispatch(request, response, time.perf_counter() - start, None)
+        return response
+
+
+def getSession():
+    profile = getProfile()
+    with my_lock:
+        if profile not in my_sessions:
+            session = requests.Session()
+            adapter = InstrumentedAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            my_sessions[profile] = session
+        return my_sessions[profile]
@@ -0,0 +1,208 @@
+#
+# devops config
+#
+# Config files for both the OpsGenie and Camunda commands.  Each service
+# keeps its own file and section, and both are read into one ConfigParser.
+#
+# A file can hold several named profiles, one per engine or account.
+# The default profile uses the plain section name, profile 'prod' uses
+# the section name followed by ':prod', e.g. [camunda-rest-engine:prod].
+#
+
+import click
+import configparser
+import contextlib
+import os
+import threading
+
+# opsgenie constants
+OPSGENIE_FILE = '~/.opsgenie.config'
+OPSGENIE_SECTION = 'opsgenie.com'
+OPSGENIE_KEY = 'GenieKey'
+
+# camunda constants
+MY_FILE = '~/.camunda-rest-engine.config'
+MY_SECTION = 'camunda-rest-engine'
+MY_KEY = 'url'
+MY_USER = 'username'
+MY_PASS = 'password'
+
+DEFAULT_PROFILE = 'default'
+
+my_config = configparser.ConfigParser()
+my_lock = threading.Lock()
+
+# the active profile is per thread so profiles can run side by side
+my_profile = threading.local()
+
+
+def readConfig(filename):
+    # expand '~/' to real pathnames
+    pathname = os.path.expanduser(filename)
+    with my_lock:
+        my_config.read(pathname)
+
+#
+# write the sections that belong in filename
+#
+def writeConfig(filename, section):
+    # expand '~/' to real pathnames
+    pathname = os.path.expanduser(filename)
+    file_config = configparser.ConfigParser()
+    file_config.read(pathname)
+    file_config[section] = my_config[section]
+    with open(pathname, 'w') as configfile:
+        file_config.write(configfile)
+
+#
+# profile helpers
+#
+def getProfile():
+    return getattr(my_profile, 'name', DEFAULT_PROFILE)
+
+@contextlib.contextmanager
+def useProfile(name):
+    previous = getProfile()
+    my_profile.name = name if name != None else DEFAULT_PROFILE
+    try:
+        yield
+    finally:
+        my_profile.name = previous
+
+# wrap func so that worker threads run it with the caller's profile
+def withProfile(func):
+    name = getProfile()
+    def run(*args, **kwargs):
+        with useProfile(name):
+            return func(*args, **kwargs)
+    return run
+
+# section name of the active profile
+def profileSection(section):
+    name = getProfile()
+    if name == DEFAULT_PROFILE:
+        return section
+    return section + ':' + name
+
+# names of the profiles defined for section
+def getProfiles(section):
+    res = []
+    for name in my_config.sections():
+        if name == section:
+            res.append(DEFAULT_PROFILE)
+        elif name.startswith(section + ':'):
+            res.append(name[len(section) + 1:])
+    return res
+
+# camunda rest engine settings
+def getKey(keyName):
+    return my_config[profileSection(MY_SECTION)][keyName]
+
+# opsgenie api key
+def getApiKey():
+    return my_config[profileSection(OPSGENIE_SECTION)][OPSGENIE_KEY]
+
+
+#
+# opsgenie config commands
+#
+
+@click.group('config')
+def opsgenie_config():
+    pass
+
+#
+# read api key from config file
+#
+@click.command('show')
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@click.option('--profile', '-p')
+def opsgenie_show(config, profile):
+    readConfig(config)
+    with useProfile(profile):
+        section = profileSection(OPSGENIE_SECTION)
+    if not my_config.has_section(section):
+        click.echo('Config file not defined: ' + config)
+        return
+    opsgenie = my_config[section]
+    if OPSGENIE_KEY not in opsgenie:
+        click.echo('OpsGenie API Key Not Defined.  Use SET command.')
+        return
+    genieKey = opsgenie[OPSGENIE_KEY]
+    click.echo('OpsGenie API Key: ' + genieKey)
+
+#
+# write api key to config file
+#
+@click.command('set')
+@click.argument('apikey')
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@click.option('--profile', '-p')
+def opsgenie_set(apikey, config, profile):
+    readConfig(config)
+    with useProfile(profile):
+        section = profileSection(OPSGENIE_SECTION)
+    if not my_config.has_section(section):
+        my_config[section] = {}
+    opsgenie = my_config[section]
+    opsgenie[OPSGENIE_KEY] = apikey
+    writeConfig(config, section)
+    click.echo('OpsGenie API Key written to ' + config)
+
+
+opsgenie_config.add_command(opsgenie_show)
+opsgenie_config.add_command(opsgenie_set)
+
+#
+# camunda config commands
+#
+
+@click.group('config')
+def camunda_config():
+    pass
+
+#
+# read api key from config file
+#
+@click.command('show')
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--profile', '-p')
+def camunda_show(config, profile):
+    readConfig(config)
+    with useProfile(profile):
+        section = profileSection(MY_SECTION)
+    if not my_config.has_section(section):
+        click.echo('Config file not defined: ' + config)
+        return
+    my_section = my_config[section]
+    if MY_KEY not in my_section:
+        click.echo(MY_KEY + ' Key Not Defined.  Use SET command.')
+        return
+    my_key = my_section[MY_KEY]
+    click.echo(MY_KEY + ' Key: ' + my_key)
+
+#
+# write my_key to config file
+#
+@click.command('set')
+@click.argument(MY_KEY)
+@click.argument(MY_USER)
+@click.argument(MY_PASS)
+@click.option('--config', '-c', default=MY_FILE)
+@click.option('--profile', '-p')
+def camunda_set(url, username, password, config, profile):
+    readConfig(config)
+    with useProfile(profile):
+        section = profileSection(MY_SECTION)
+    if not my_config.has_section(section):
+        my_config[section] = {}
+    my_section = my_config[section]
+    my_section[MY_KEY] = url
+    my_section[MY_USER] = username
+    my_section[MY_PASS] = password
+    writeConfig(config, section)
+    click.echo(MY_KEY + ' Key written to ' + config)
+
+
+camunda_config.add_command(camunda_show)
+camunda_config.add_command(camunda_set)
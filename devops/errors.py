@@ -0,0 +1,42 @@
+#
+# devops errors
+#
+# Typed errors raised by the REST wrappers.  They keep the
+# (status, text) args of the plain Exception the wrappers used to raise,
+# so exc.args[0] == 429 checks and 'returned error (404, ...)' messages
+# work as before, and callers can also catch them by type.
+#
+
+class RestError(Exception):
+    def __init__(self, status, text):
+        super().__init__(status, text)
+        self.status = status
+        self.text = text
+
+# 4xx other than 429: the request itself is wrong, retrying won't help
+class ClientError(RestError):
+    pass
+
+class NotFoundError(ClientError):
+    pass
+
+# 429: back off and try again
+class RateLimitError(RestError):
+    pass
+
+# 5xx: the engine or api is in trouble
+class ServerError(RestError):
+    pass
+
+#
+# typed error for an unexpected response
+#
+def rest_error(resp):
+    status = resp.status_code
+    if status == 429:
+        return RateLimitError(status, resp.text)
+    if status == 404:
+        return NotFoundError(status, resp.text)
+    if status >= 500:
+        return ServerError(status, resp.text)
+    return ClientError(status, resp.text)
@@ -0,0 +1,156 @@
+#
+# devops journal
+#
+# Append-only journal for long bulk operations like alerts delete and
+# procdef deleteinstances.  The first line records the operation plan
+# (the command, its options and every id it is going to work on), then
+# one line is appended as each id is done:
+#
+#   {"plan": "alerts delete", "params": {...}, "ids": ["id1", "id2", ...]}
+#   {"done": "id1"}
+#   {"done": "id2"}
+#
+# If the run is interrupted, running the command again with --resume reads
+# the plan back and carries on with the ids that are not done, without
+# repeating the list queries.  At the end the journal is compacted to a
+# single plan line holding only the ids that are still pending.
+#
+# The journal file name can contain {profile}, which is replaced by the
+# config profile so runs against several profiles keep separate journals.
+# With --profiles or --all-profiles and no {profile} in the name, the
+# profile is added before the extension: delete.journal -> delete.prod.journal.
+#
+# A new run does not overwrite an existing journal, which may hold the
+# pending ids of an interrupted run, unless --overwrite-journal is given.
+#
+
+import click
+import json
+import os
+
+# config module
+from devops.config import getProfile
+from devops.profiles import fanout_profile
+
+
+def journal_options(func):
+    func = click.option('--overwrite-journal', 'overwrite', is_flag=True,
+                        help='start a new journal even if the journal file exists')(func)
+    func = click.option('--resume', is_flag=True, help='carry on from the plan in the journal file')(func)
+    func = click.option('--journal', '-j', type=click.Path(dir_okay=False),
+                        help='record the plan and completed ids in this file')(func)
+    return func
+
+def journal_filename(filename):
+    if '{profile}' not in filename and fanout_profile() != None:
+        root, ext = os.path.splitext(filename)
+        filename = root + '.{profile}' + ext
+    return os.path.expanduser(filename.replace('{profile}', getProfile()))
+
+#
+# raises Exception if a new journal would replace the one in filename,
+# checked before a command lists anything
+#
+def journal_check(filename, overwrite):
+    filename = journal_filename(filename)
+    if not overwrite and os.path.exists(filename):
+        raise Exception('journal exists, use --resume or --overwrite-journal', filename)
+
+
+class Journal:
+    def __init__(self, filename, command, params, ids, done, completed):
+        self.filename = filename
+        self.command = command
+        self.params = params
+        self.ids = ids
+        self.completed = completed
+        self.finished = done
+        self.journalfile = None
+        # False if the last line was cut short
+        self.complete = True
+
+    # ids of the plan that are not done yet, in plan order
+    def pending(self):
+        return [id for id in self.ids if id not in self.finished]
+
+    def done(self, id):
+        self.finished.add(id)
+        self.journalfile.write(json.dumps({'done': id}) + '\n')
+        self.journalfile.flush()
+
+    #
+    # rewrite the journal as one plan line with the pending ids.
+    # The new file is written next to the old one and renamed over it,
+    # so an interrupted compaction leaves the old journal in place.
+    #
+    def compact(self):
+        self.close()
+        pending = self.pending()
+        plan = {'plan': self.command, 'params': self.params, 'ids': pending,
+                'completed': self.completed + len(self.ids) - len(pending)}
+        tmpname = self.filename + '.tmp'
+        with open(tmpname, 'w') as tmpfile:
+            tmpfile.write(json.dumps(plan) + '\n')
+        os.replace(tmpname, self.filename)
+        return pending
+
+    def close(self):
+        if self.journalfile != None:
+            self.journalfile.close()
+            self.journalfile = None
+
+#
+# start a new journal for command, see journal_check
+#
+def journal_start(filename, command, params, ids, overwrite=False):
+    filename = journal_filename(filename)
+    jnl = Journal(filename, command, params, ids, set(), 0)
+    try:
+        jnl.journalfile = open(filename, 'w' if overwrite else 'x')
+    except FileExistsError:
+        raise Exception('journal exists, use --resume or --overwrite-journal', filename)
+    jnl.journalfile.write(json.dumps({'plan': command, 'params': params, 'ids': ids}) + '\n')
+    jnl.journalfile.flush()
+    return jnl
+
+#
+# read back the journal of an interrupted run of command, without
+# opening it for writing
+# raises Exception if there is no usable plan in filename
+#
+def journal_read(filename, command):
+    filename = journal_filename(filename)
+    if not os.path.exists(filename):
+        raise Exception('no journal', filename)
+    plan = None
+    done = set()
+    line = '\n'
+    with open(filename) as journalfile:
+        for line in journalfile:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # last line cut short when the run was killed
+                continue
+            if 'plan' in entry:
+                plan = entry
+            elif 'done' in entry:
+                done.add(entry['done'])
+    if plan == None:
+        raise Exception('no plan in journal', filename)
+    if plan['plan'] != command:
+        raise Exception('journal is for another command', plan['plan'])
+    jnl = Journal(filename, command, plan['params'], plan['ids'], done, plan.get('completed', 0))
+    jnl.complete = line.endswith('\n')
+    return jnl
+
+#
+# read back the journal of an interrupted run of command and open it
+# to record more completed ids
+#
+def journal_resume(filename, command):
+    jnl = journal_read(filename, command)
+    jnl.journalfile = open(jnl.filename, 'a')
+    if not jnl.complete:
+        jnl.journalfile.write('\n')
+    return jnl
@@ -0,0 +1,945 @@
+#
+# Manage OpsGenie Alerts in Bulk
+#
+# Author: Chris Maeda (cmaeda@cmaeda.com)
+
+#
+# Example Usage
+#
+# 1. count open alerts in Dec 2018
+# devops opsgenie alerts count -s open --since 2018-12-01 --before 2019-01-01
+#
+# 2. view open alerts in Dec 2018
+# devops opsgenie alerts list -s open --since 2018-12-01 --before 2019-01-01
+#
+# 3. close open alerts in Dec 2018
+# devops opsgenie alerts close --since 2018-12-01 --before 2019-01-01
+#
+# 4. delete closed alerts in Dec 2018
+# devops opsgenie alerts delete -s closed --since 2018-12-01 --before 2019-01-01
+#
+# 5. prune alerts caused by API limits, or by the rules in a rules file
+#
+# devops opsgenie alerts prune --since 2018-12-01 --before 2019-01-01
+# devops opsgenie alerts prune --since 2018-12-01 -l 5000 --rules noise.rules
+#
+# 6. delete with a journal, and carry on after an interruption
+#
+# devops opsgenie alerts delete -s closed --before 2019-01-01 -l 100 --journal delete.journal
+# devops opsgenie alerts delete --journal delete.journal --resume
+#
+# 7. hourly alert counts in Dec 2018, split by priority, as csv
+#
+# devops opsgenie alerts histogram --since 2018-12-01 --before 2019-01-01 --interval hour --by priority --format csv
+#
+# 8. keep a compressed copy of closed alerts, before or while deleting them,
+#    and search the copy
+#
+# devops opsgenie alerts archive alerts-2018.ndjson.gz -s closed --before 2019-01-01 -l 5000
+# devops opsgenie alerts delete -s closed --before 2019-01-01 -l 5000 --archive alerts-2018.ndjson.gz
+# devops opsgenie alerts archivequery alerts-2018.ndjson.gz -m message=Disk --format csv
+#
+# 9. collapse an alert storm: close all but the oldest alert of every group of
+#    open alerts whose messages differ only in ids, times, addresses or hosts
+#
+# devops opsgenie alerts dedup --since 2018-12-01 -l 10000
+#
+# 10. estimate the calls, time and memory of a bulk delete without deleting anything
+#
+# devops opsgenie alerts delete -s closed --before 2019-01-01 -l 50000 --plan
+#
+# Alerts caused by API limits have the string 'You are making too many requests!'
+# in the alert description.  See rules.py for the rules file format.
+#
+# Note that the close and delete commands first perform a list query, a page
+# of PAGE_SIZE alerts at a time, then they call close or delete on the alert
+# records returned by the query.
+#
+# All commands, other than count, take offset and limit args
+# which control paged access to the result set of the list query.
+#
+
+import click
+import json
+import datetime
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# config module
+from devops.config import readConfig, getApiKey, withProfile, OPSGENIE_FILE, OPSGENIE_SECTION
+from devops.client import getSession
+from devops.errors import rest_error
+from devops.cache import cached, invalidate
+from devops.output import RecordWriter, format_option
+from devops.journal import journal_options, journal_check, journal_start, journal_resume, journal_read
+from devops.plan import Plan, plan_options
+from devops.records import IdList
+from devops.opsgenie.rules import rules_read, field_text
+from devops.archive import ArchiveWriter, archive_read
+from devops.opsgenie.dedup import ClusterStore
+from devops.opsgenie.watermark import Watermark, alert_time
+
+# largest page the alert list api returns
+PAGE_SIZE = 100
+
+#
+# Implement Alerts Commands
+#
+# These are wrappers around the Alerts REST API
+# See https://docs.opsgenie.com/docs/alert-api
+#
+
+#
+# Makes an opsgenie alert search query.
+# See https://docs.opsgenie.com/docs/alerts-search-query-help
+#
+# status should be 'open' / 'closed'
+# before and since should be 'YYYY-mm-DD', e.g. '2018-12-01', a local time
+# like '2018-12-01T13:30' or '2018-12-01 13:30:15', or a unix timestamp
+def alert_makequery(status, before, since):
+    query = None
+    if status != None:
+        query = 'status:' + status
+    if before != None:
+        datebeforets = alert_parsetime(before)
+        beforeterm = 'lastOccurredAt < ' + str(datebeforets)
+        if query != None:
+            query = query + ' AND ' + beforeterm
+        else:
+            query = beforeterm
+    if since != None:
+        datesincets = alert_parsetime(since)
+        sinceterm = 'lastOccurredAt >= ' + str(datesincets)
+        if query != None:
+            query = query + ' AND ' + sinceterm
+        else:
+            query = sinceterm
+    return query
+
+ALERT_TIME_FORMATS = ['%Y-%m-%d', '%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S']
+
+#
+# unix timestamp for a before/since value, see alert_makequery
+# raises ValueError for anything else
+#
+def alert_parsetime(value):
+    if isinstance(value, (int, float)):
+        return int(value)
+    if value.isdigit():
+        return int(value)
+    for fmt in ALERT_TIME_FORMATS:
+        try:
+            # parse to datetime then convert to unix timestamp
+            return int(datetime.datetime.strptime(value, fmt).timestamp())
+        except ValueError:
+            continue
+    raise ValueError('time data ' + repr(value) + ' is not a date, local time or unix timestamp')
+
+#
+# add a lastOccurredAt range to query, start and end are unix timestamps
+#
+def alert_rangequery(query, start, end):
+    rangeterm = 'lastOccurredAt >= ' + str(int(start)) + ' AND lastOccurredAt < ' + str(int(end))
+    if query != None:
+        return query + ' AND ' + rangeterm
+    return rangeterm
+
+# Count matching alert records
+# See https://docs.opsgenie.com/docs/alert-api#section-count-alerts
+def alerts_getcount(apiKey, query):
+    headers = {'Authorization': 'GenieKey ' + apiKey}
+    if query != None:
+        params = {'query': query}
+    else:
+        params = {}
+    resp = getSession().get('https://api.opsgenie.com/v2/alerts/count', headers=headers, params=params)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    respjsondata = respjson['data']['count']
+    return respjsondata
+
+# List matching alert records
+# See https://docs.opsgenie.com/docs/alert-api#section-list-alerts
+# offset and limit control paging in the result set
+# sort names a field like 'lastOccurredAt' and order is 'asc' / 'desc'
+def alerts_list(apiKey, query, offset, limit, sort=None, order=None):
+    headers = {'Authorization': 'GenieKey ' + apiKey}
+    if query != None:
+        params = {'query': query}
+    else:
+        params = {}
+    params['offset'] = offset
+    params['limit'] = limit
+    if sort != None:
+        params['sort'] = sort
+    if order != None:
+        params['order'] = order
+    
+    resp = getSession().get('https://api.opsgenie.com/v2/alerts', headers=headers, params=params)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    respjsondata = respjson['data']
+    return respjsondata
+
+# Get a single alert using its id
+# See https://docs.opsgenie.com/docs/alert-api#section-get-alert
+@cached('alerts_get', OPSGENIE_SECTION)
+def alerts_get(apiKey, alertId):
+    headers = {'Authorization': 'GenieKey ' + apiKey}
+    resp = getSession().get('https://api.opsgenie.com/v2/alerts/' + alertId, headers=headers)
+    if resp.status_code != 200:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    respjsondata = respjson['data']
+    return respjsondata
+
+# Close a single alert using its id
+# The user, source, and note arguments are attached to the closure record
+# See https://docs.opsgenie.com/docs/alert-api#section-close-alert
+def alerts_close(apiKey, alertId, user, source, note):
+    headers = {'Authorization': 'GenieKey ' + apiKey, 'Content-Type': 'application/json'}
+    data = {}
+    if user != None:
+        data["user"] = user
+    if source != None:
+        data["source"] = source
+    if note != None:
+        data["note"] = note
+    # must parse json to string so that requests package passes it through without modification
+    postdata = json.dumps(data)
+    resp = getSession().post('https://api.opsgenie.com/v2/alerts/' + alertId + '/close', headers=headers, data=postdata)
+    if resp.status_code != 202:
+        raise rest_error(resp)
+    invalidate('alerts_get', OPSGENIE_SECTION, apiKey, alertId)
+    respjson = json.loads(resp.text)
+    return respjson
+
+# Acknowledge a single alert using its id
+# See https://docs.opsgenie.com/docs/alert-api#section-acknowledge-alert
+def alerts_acknowledge(apiKey, alertId, user, source, note):
+    headers = {'Authorization': 'GenieKey ' + apiKey, 'Content-Type': 'application/json'}
+    data = {}
+    if user != None:
+        data["user"] = user
+    if source != None:
+        data["source"] = source
+    if note != None:
+        data["note"] = note
+    postdata = json.dumps(data)
+    resp = getSession().post('https://api.opsgenie.com/v2/alerts/' + alertId + '/acknowledge', headers=headers, data=postdata)
+    if resp.status_code != 202:
+        raise rest_error(resp)
+    invalidate('alerts_get', OPSGENIE_SECTION, apiKey, alertId)
+    respjson = json.loads(resp.text)
+    return respjson
+
+# Add a note to an alert
+# See https://docs.opsgenie.com/docs/alert-api#section-add-note-to-alert
+def alerts_addnote(apiKey, alertId, user, source, note):
+    headers = {'Authorization': 'GenieKey ' + apiKey, 'Content-Type': 'application/json'}
+    data = {'note': note}
+    if user != None:
+        data["user"] = user
+    if source != None:
+        data["source"] = source
+    postdata = json.dumps(data)
+    resp = getSession().post('https://api.opsgenie.com/v2/alerts/' + alertId + '/notes', headers=headers, data=postdata)
+    if resp.status_code != 202:
+        raise rest_error(resp)
+    respjson = json.loads(resp.text)
+    return respjson
+
+# Delete a single alert using its id
+# See https://docs.opsgenie.com/docs/alert-api#section-delete-alert
+def alerts_delete(apiKey, alertId):
+    headers = {'Authorization': 'GenieKey ' + apiKey}
+    resp = getSession().delete('https://api.opsgenie.com/v2/alerts/' + alertId, headers=headers)
+    if resp.status_code != 202:
+        raise rest_error(resp)
+    invalidate('alerts_get', OPSGENIE_SECTION, apiKey, alertId)
+    respjson = json.loads(resp.text)
+    return respjson
+
+
+#
+# Code to implement the command line interface using the click package.
+# See https://click.palletsprojects.com/en/7.x/
+#
+
+@click.group()
+def alerts():
+    pass
+
+# csv columns and table line for alert details
+ALERT_FIELDS = ['id', 'tinyId', 'alias', 'status', 'acknowledged', 'priority', 'source',
+                'createdAt', 'updatedAt', 'lastOccurredAt', 'count', 'message', 'description', 'tags']
+
+def alert_tableline(adata):
+    al_alias = adata['alias']
+    al_status = adata['status']
+    al_desc = adata['description']
+    al_createdAt = adata['createdAt']
+    return 'Alert ' + al_alias + ' createdAt:' + al_createdAt + ' status:' + al_status + ' desc:' + al_desc + '\n'
+
+@click.command()
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@click.option('--status', '-s')
+@click.option('--before')
+@click.option('--since', '--after')
+def count(config, status, before, since):
+    readConfig(config)
+    apiKey = getApiKey()
+    query = alert_makequery(status, before, since)
+    try:
+        res = alerts_getcount(apiKey, query)
+    except Exception as exc:
+        click.echo('Error: opsgenie api returned error ' + str(exc.args))
+        return None
+    click.echo('Alert Count ' + str(res))
+    return res
+
+@click.command()
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@click.option('--status', '-s')
+@click.option('--before')
+@click.option('--since', '--after')
+@click.option('--offset', '-o', default=0)
+@click.option('--limit', '-l', default=20)
+@click.option('--state', type=click.Path(dir_okay=False), help='only list alerts newer than the watermark in this file')
+@format_option
+def list(config, status, before, since, offset, limit, state, outformat):
+    readConfig(config)
+    apiKey = getApiKey()
+    if state != None:
+        return list_incremental(apiKey, status, before, since, limit, state, outformat)
+    query = alert_makequery(status, before, since)
+    try:
+        res = alerts_list(apiKey, query, offset, limit)
+    except Exception as exc:
+        click.echo('Error: opsgenie api returned error ' + str(exc.args))
+        return None
+    writer = RecordWriter(outformat, ALERT_FIELDS, alert_tableline)
+    writer.header('Alert Count ' + str(len(res)))
+    for adef in res:
+        al_id = adef['id']
+        adata = alerts_get(apiKey, al_id)
+        writer.write(adata)
+    writer.close()
+    return res
+
+#
+# list with --state: alerts since the watermark, oldest first, up to limit.
+# The watermark moves past every alert listed, so the next run carries on
+# where this one stopped.
+#
+def list_incremental(apiKey, status, before, since, limit, state, outformat):
+    watermark = Watermark(state, 'list ' + (status if status != None else 'any'))
+    query = alert_makequery(status, before, watermark.since(since))
+    writer = RecordWriter(outformat, ALERT_FIELDS, alert_tableline)
+    res = []
+    offset = 0
+    while len(res) < limit:
+        pagesize = min(PAGE_SIZE, limit - len(res))
+        try:
+            page = alerts_list(apiKey, query, offset, pagesize, 'lastOccurredAt', 'asc')
+            for adef in page:
+                if len(res) < limit and watermark.is_new(adef):
+                    writer.write(alerts_get(apiKey, adef['id']))
+                    watermark.advance(adef)
+                    res.append(adef)
+        except Exception as exc:
+            writer.close()
+            watermark.save()
+            click.echo('Error: opsgenie api returned error ' + str(exc.args))
+            return None
+        offset = offset + len(page)
+        if len(page) < pagesize:
+            break
+    watermark.save()
+    writer.header('New Alert Count ' + str(len(res)))
+    writer.close()
+    return res
+
+#
+# --plan: alerts a bulk command would work on, from a count query
+#
+def alerts_plancount(plan, apiKey, query, offset, limit):
+    total = plan.query(alerts_getcount, apiKey, query)
+    return max(0, min(total - offset, limit))
+
+# ids of the alerts matching query, from offset up to limit alerts, a page at a time
+def alerts_listids(apiKey, query, offset, limit):
+    ids = IdList()
+    while len(ids) < limit:
+        pagesize = min(PAGE_SIZE, limit - len(ids))
+        page = alerts_list(apiKey, query, offset + len(ids), pagesize)
+        ids.extend([adef['id'] for adef in page])
+        if len(page) < pagesize:
+            break
+    return ids
+
+#
+# delete alerts matching criteria
+# with --journal the alert ids and each deletion are recorded so that
+# --resume can finish an interrupted run without listing the alerts again
+#
+@click.command()
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@click.option('--status', '-s')
+@click.option('--before')
+@click.option('--since', '--after')
+@click.option('--offset', '-o', default=0)
+@click.option('--limit', '-l', default=20)
+@click.option('--archive', 'archivefile', type=click.Path(dir_okay=False), help='archive alert details here before deleting')
+@click.option('--workers', default=8, help='alerts to fetch at the same time for --archive')
+@journal_options
+@plan_options
+def delete(config, status, before, since, offset, limit, archivefile, workers, journal, resume, overwrite, plan, planrate):
+    readConfig(config)
+    apiKey = getApiKey()
+    if plan:
+        return delete_plan(apiKey, status, before, since, offset, limit, archivefile, workers, journal, resume, planrate)
+    jnl = None
+    if journal != None and not resume:
+        try:
+            journal_check(journal, overwrite)
+        except Exception as exc:
+            click.echo('Error: cannot start journal ' + str(exc.args))
+            return None
+    writer = None
+    if archivefile != None:
+        try:
+            writer = ArchiveWriter(archivefile)
+        except Exception as exc:
+            click.echo('Error: cannot open archive ' + str(exc.args))
+            return None
+    if resume:
+        if journal == None:
+            click.echo('Must specify --journal option with --resume')
+            return None
+        try:
+            jnl = journal_resume(journal, 'alerts delete')
+        except Exception as exc:
+            click.echo('Error: cannot resume ' + str(exc.args))
+            return None
+        ids = jnl.pending()
+        click.echo('Resuming Alert Count ' + str(len(ids)))
+    else:
+        query = alert_makequery(status, before, since)
+        try:
+            ids = alerts_listids(apiKey, query, offset, limit)
+        except Exception as exc:
+            click.echo('Error: opsgenie api returned error ' + str(exc.args))
+            return None
+        click.echo('Alert Count ' + str(len(ids)))
+        if journal != None:
+            params = {'status': status, 'before': before, 'since': since, 'offset': offset, 'limit': limit}
+            try:
+                jnl = journal_start(journal, 'alerts delete', params, ids.tolist(), overwrite)
+            except Exception as exc:
+                click.echo('Error: cannot start journal ' + str(exc.args))
+                return None
+    for i, al_id in enumerate(ids):
+        try:
+            if writer != None and i % PAGE_SIZE == 0:
+                # the next block of alerts is on disk before any of them is deleted
+                alerts_archive(apiKey, writer, ids[i:i + PAGE_SIZE], workers)
+            delres = alerts_delete(apiKey, al_id)
+            click.echo('Deleted Alert ' + al_id)
+        except Exception as exc:
+            click.echo('Error: opsgenie api returned error ' + str(exc.args))
+            if jnl != None:
+                jnl.close()
+            return None
+        if jnl != None:
+            jnl.done(al_id)
+    if jnl != None:
+        jnl.compact()
+    if writer != None:
+        click.echo('Archived ' + str(writer.count) + ' to ' + archivefile)
+    return ids
+
+def delete_plan(apiKey, status, before, since, offset, limit, archivefile, workers, journal, resume, planrate):
+    pln = Plan('alerts delete', 'opsgenie', planrate)
+    if resume:
+        if journal == None:
+            click.echo('Must specify --journal option with --resume')
+            return None
+        try:
+            pln.records = len(journal_read(journal, 'alerts delete').pending())
+        except Exception as exc:
+            click.echo('Error: cannot resume ' + str(exc.args))
+            return None
+    else:
+        try:
+            pln.records = alerts_plancount(pln, apiKey, alert_makequery(status, before, since), offset, limit)
+        except Exception as exc:
+            click.echo('Error: opsgenie api returned error ' + str(exc.args))
+            return None
+        pln.calls('GET /v2/alerts', max(1, math.ceil(pln.records / PAGE_SIZE)))
+        pln.hold('alert', min(pln.records, PAGE_SIZE))
+    if archivefile != None:
+        # alerts already in the archive are not fetched again
+        pln.calls('GET /v2/alerts/{id}', pln.records, workers, upto=True)
+        pln.hold('alert details', min(pln.records, PAGE_SIZE))
+    pln.calls('DELETE /v2/alerts/{id}', pln.records)
+    pln.hold('id' if journal != None else 'packed id', pln.records)
+    pln.echo()
+    return pln.records
+
+#
+# close alerts matching criteria
+#
+@click.command()
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@click.option('--before')
+@click.option('--since', '--after')
+@click.option('--offset', '-o', default=0)
+@click.option('--limit', '-l', default=20)
+@plan_options
+def close(config, before, since, offset, limit, plan, planrate):
+    readConfig(config)
+    apiKey = getApiKey()
+    query = alert_makequery('open', before, since)
+    if plan:
+        pln = Plan('alerts close', 'opsgenie', planrate)
+        try:
+            pln.records = alerts_plancount(pln, apiKey, query, offset, limit)
+        except Exception as exc:
+            click.echo('Error: opsgenie api returned error ' + str(exc.args))
+            return None
+        pln.calls('GET /v2/alerts', max(1, math.ceil(pln.records / PAGE_SIZE)))
+        pln.calls('POST /v2/alerts/{id}/close', pln.records)
+        pln.hold('alert', min(pln.records, PAGE_SIZE))
+        pln.hold('packed id', pln.records)
+        pln.echo()
+        return pln.records
+    try:
+        ids = alerts_listids(apiKey, query, offset, limit)
+    except Exception as exc:
+        click.echo('Error: opsgenie api returned error ' + str(exc.args))
+        return None
+    click.echo('Alert Count ' + str(len(ids)))
+    for al_id in ids:
+        try:
+            delres = alerts_close(apiKey, al_id, None, None, None)
+            click.echo('Closed Alert ' + al_id)
+        except Exception as exc:
+            click.echo('Error: opsgenie api returned error ' + str(exc.args))
+            return None
+    return ids
+
+#
+# close, delete or acknowledge known-noise alerts matching the rules file,
+# see rules.py.  Without --rules, alerts caused by API limits are closed.
+# Open alerts are read a page at a time, from offset up to limit alerts.
+#
+@click.command()
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@click.option('--before')
+@click.option('--since', '--after')
+@click.option('--offset', '-o', default=0)
+@click.option('--limit', '-l', default=20)
+@click.option('--rules', '-r', type=click.Path(exists=True, dir_okay=False), help='prune rules file')
+@click.option('--state', type=click.Path(dir_okay=False), help='only prune alerts newer than the watermark in this file')
+@plan_options
+def prune(config, before, since, offset, limit, rules, state, plan, planrate):
+    try:
+        ruleset = rules_read(rules)
+    except Exception as exc:
+        click.echo('Error: cannot read rules ' + str(exc.args))
+        return None
+    readConfig(config)
+    apiKey = getApiKey()
+    watermark = None
+    sort = None
+    order = None
+    if state != None:
+        # oldest first, so an interrupted or limited run leaves a valid watermark
+        watermark = Watermark(state, 'prune open')
+        since = watermark.since(since)
+        sort = 'lastOccurredAt'
+        order = 'asc'
+    query = alert_makequery('open', before, since)
+    needDetails = ruleset.needs_details()
+    if plan:
+        return prune_plan(apiKey, query, offset, limit, ruleset, planrate)
+    seen = 0
+    res = IdList()
+    while seen < limit:
+        try:
+            page = alerts_list(apiKey, query, offset, min(PAGE_SIZE, limit - seen), sort, order)
+        except Exception as exc:
+            click.echo('Error: opsgenie api returned error ' + str(exc.args))
+            if watermark != None:
+                watermark.save()
+            return None
+        for adef in page:
+            al_id = adef['id']
+            if watermark != None and not watermark.is_new(adef):
+                continue
+            try:
+                adata = alerts_get(apiKey, al_id) if needDetails else adef
+            except Exception as exc:
+                click.echo('Error: opsgenie api returned error ' + str(exc.args))
+                if watermark != None:
+                    watermark.save()
+                return None
+            al_alias = adata['alias']
+            rule = ruleset.match(adata)
+            if rule == None:
+                click.echo('Alert ' + adata['createdAt'] + ' alias:' + al_alias + ' status:' + adata['status'] + ' Ignored')
+                if watermark != None:
+                    watermark.advance(adef)
+                continue
+            click.echo('Alert ' + al_alias + ' matches rule ' + rule.name + ' (id:' + al_id + ')')
+            try:
+                if rule.action == 'delete':
+                    alerts_delete(apiKey, al_id)
+                    click.echo('Deleted Alert ' + al_id)
+                elif rule.action == 'ack':
+                    alerts_acknowledge(apiKey, al_id, 'devops', None, rule.note)
+                    click.echo('Acknowledged Alert ' + al_id)
+                else:
+                    alerts_close(apiKey, al_id, 'devops', None, rule.note)
+                    click.echo('Closed Alert ' + al_id)
+            except Exception as exc:
+                click.echo('Error: opsgenie api returned error ' + str(exc.args))
+                if watermark != None:
+                    watermark.save()
+                return None
+            res.append(al_id)
+            if watermark != None:
+                watermark.advance(adef)
+            if rule.action != 'ack':
+                # closed and deleted alerts drop out of the open query
+                offset = offset - 1
+        seen = seen + len(page)
+        offset = offset + len(page)
+        if len(page) == 0:
+            break
+    if watermark != None:
+        watermark.save()
+    click.echo('Alert Count ' + str(seen))
+    for rule in ruleset.rules:
+        click.echo('Rule ' + rule.name + ' action:' + rule.action + ' hits:' + str(ruleset.hits[rule.name]))
+    return res
+
+#
+# which alerts match the rules is only known once they are read,
+# so the close, delete and ack calls are an upper bound
+#
+def prune_plan(apiKey, query, offset, limit, ruleset, planrate):
+    pln = Plan('alerts prune', 'opsgenie', planrate)
+    try:
+        pln.records = alerts_plancount(pln, apiKey, query, offset, limit)
+    except Exception as exc:
+        click.echo('Error: opsgenie api returned error ' + str(exc.args))
+        return None
+    pln.calls('GET /v2/alerts', max(1, math.ceil(pln.records / PAGE_SIZE)))
+    if ruleset.needs_details():
+        pln.calls('GET /v2/alerts/{id}', pln.records)
+    # one of these per matching alert
+    actions = set([rule.action for rule in ruleset.rules])
+    endpoints = [endpoint for action, endpoint in [('close', 'POST /v2/alerts/{id}/close'),
+                                                   ('delete', 'DELETE /v2/alerts/{id}'),
+                                                   ('ack', 'POST /v2/alerts/{id}/acknowledge')]
+                 if action in actions]
+    pln.calls(' or '.join(endpoints), pln.records, upto=True)
+    pln.hold('alert', min(pln.records, PAGE_SIZE))
+    pln.echo()
+    return pln.records
+
+
+#
+# fetch the details of the alerts in ids that are not archived yet,
+# write them to the archive and sync it
+#
+def alerts_archive(apiKey, writer, ids, workers):
+    ids = [al_id for al_id in ids if not writer.has(al_id)]
+    getalert = withProfile(alerts_get)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for adata in executor.map(lambda al_id: getalert(apiKey, al_id), ids):
+            writer.write(adata)
+    writer.flush()
+    return len(ids)
+
+#
+# copy alert details to a compressed archive file (.gz, or .zst with the
+# zstandard package), skipping alerts that are already in it
+#
+@click.command()
+@click.argument('archivefile', type=click.Path(dir_okay=False))
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@click.option('--status', '-s')
+@click.option('--before')
+@click.option('--since', '--after')
+@click.option('--offset', '-o', default=0)
+@click.option('--limit', '-l', default=20)
+@click.option('--workers', default=8, help='alerts to fetch at the same time')
+def archive(archivefile, config, status, before, since, offset, limit, workers):
+    readConfig(config)
+    apiKey = getApiKey()
+    query = alert_makequery(status, before, since)
+    try:
+        writer = ArchiveWriter(archivefile)
+    except Exception as exc:
+        click.echo('Error: cannot open archive ' + str(exc.args))
+        return None
+    seen = 0
+    archived = 0
+    while seen < limit:
+        try:
+            page = alerts_list(apiKey, query, offset + seen, min(PAGE_SIZE, limit - seen))
+            archived = archived + alerts_archive(apiKey, writer, [adef['id'] for adef in page], workers)
+        except Exception as exc:
+            click.echo('Error: opsgenie api returned error ' + str(exc.args))
+            return None
+        seen = seen + len(page)
+        if len(page) == 0:
+            break
+    click.echo('Alert Count ' + str(seen) + ' archived:' + str(archived) + ' skipped:' + str(seen - archived))
+    return archived
+
+#
+# search an alert archive
+# --since and --before compare with createdAt and take the same dates, local
+# times or unix timestamps as the other commands, --match FIELD=REGEX
+# searches a field and can be given more than once
+#
+@click.command()
+@click.argument('archivefile', type=click.Path(exists=True, dir_okay=False))
+@click.option('--status', '-s')
+@click.option('--before')
+@click.option('--since', '--after')
+@click.option('--match', '-m', 'matches', multiple=True, help='FIELD=REGEX')
+@click.option('--count', 'countonly', is_flag=True, help='only print the number of matches')
+@format_option
+def archivequery(archivefile, status, before, since, matches, countonly, outformat):
+    tests = []
+    for match in matches:
+        if '=' not in match:
+            click.echo('Must specify --match as FIELD=REGEX')
+            return None
+        field, pattern = match.split('=', 1)
+        try:
+            tests.append((field, re.compile(pattern)))
+        except re.error as exc:
+            click.echo('Error: bad --match pattern ' + str(exc.args))
+            return None
+    try:
+        sincets = alert_parsetime(since) if since != None else None
+        beforets = alert_parsetime(before) if before != None else None
+    except ValueError as exc:
+        click.echo('Error: ' + str(exc.args[0]))
+        return None
+    writer = RecordWriter(outformat, ALERT_FIELDS, alert_tableline)
+    found = 0
+    try:
+        for adata in archive_read(archivefile):
+            if status != None and adata.get('status') != status:
+                continue
+            if sincets != None or beforets != None:
+                if adata.get('createdAt') == None:
+                    continue
+                created = alert_time(adata, 'createdAt')
+                if sincets != None and created < sincets:
+                    continue
+                if beforets != None and created >= beforets:
+                    continue
+            if not all(regex.search(field_text(adata.get(field))) for field, regex in tests):
+                continue
+            found = found + 1
+            if not countonly:
+                writer.write(adata)
+    except Exception as exc:
+        writer.close()
+        click.echo('Error: cannot read archive ' + str(exc.args))
+        return None
+    writer.close()
+    if countonly or outformat == 'table':
+        click.echo('Alert Count ' + str(found))
+    return found
+
+#
+# close duplicate open alerts, see dedup.py
+# alerts are grouped by fingerprint of their message (and description with
+# --description); in every group of --minsize or more the oldest alert stays
+# open with a note of the count and the others are closed
+#
+@click.command()
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@click.option('--before')
+@click.option('--since', '--after')
+@click.option('--offset', '-o', default=0)
+@click.option('--limit', '-l', default=1000)
+@click.option('--description', 'withdescription', is_flag=True, help='also fingerprint descriptions (one get per alert)')
+@click.option('--minsize', default=2, help='smallest group of alerts to collapse')
+@click.option('--workers', default=8, help='alerts to close at the same time')
+def dedup(config, before, since, offset, limit, withdescription, minsize, workers):
+    readConfig(config)
+    apiKey = getApiKey()
+    query = alert_makequery('open', before, since)
+    fields = ['message', 'description'] if withdescription else ['message']
+    store = ClusterStore(fields)
+    getalert = withProfile(alerts_get)
+    seen = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while seen < limit:
+                pagesize = min(PAGE_SIZE, limit - seen)
+                page = alerts_list(apiKey, query, offset + seen, pagesize)
+                if withdescription:
+                    page = executor.map(lambda adef: getalert(apiKey, adef['id']), page)
+                count = 0
+                for adata in page:
+                    store.add(adata)
+                    count = count + 1
+                seen = seen + count
+                if count < pagesize:
+                    break
+    except Exception as exc:
+        click.echo('Error: opsgenie api returned error ' + str(exc.args))
+        return None
+
+    storms = store.storms(minsize)
+    click.echo('Alert Count ' + str(seen) + ' groups:' + str(len(store.clusters)) + ' duplicate groups:' + str(len(storms)))
+    closealert = withProfile(alerts_close)
+    addnote = withProfile(alerts_addnote)
+
+    def close_duplicate(al_id, note):
+        closealert(apiKey, al_id, 'devops', None, note)
+        return al_id
+
+    res = IdList()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for cluster in storms:
+                click.echo('Group count:' + str(cluster.count()) + ' keep:' + cluster.keep + ' message:' + cluster.text)
+                note = 'Closed by dedup as duplicate of ' + cluster.keep + ' (' + str(cluster.count()) + ' alerts)'
+                for al_id in executor.map(lambda al_id: close_duplicate(al_id, note), cluster.ids):
+                    click.echo('Closed Alert ' + al_id)
+                    res.append(al_id)
+                addnote(apiKey, cluster.keep, 'devops', None,
+                        'dedup closed ' + str(len(cluster.ids)) + ' duplicates of this alert')
+    except Exception as exc:
+        click.echo('Error: opsgenie api returned error ' + str(exc.args))
+        return None
+    click.echo('Closed ' + str(len(res)) + ' duplicate alerts')
+    return res
+
+#
+# alert counts per hour or day, one count query per bucket and split value
+#
+HISTOGRAM_INTERVALS = {'hour': datetime.timedelta(hours=1), 'day': datetime.timedelta(days=1)}
+HISTOGRAM_SPLITS = {
+    'status': ('status', ['open', 'closed']),
+    'priority': ('priority', ['P1', 'P2', 'P3', 'P4', 'P5']),
+    'tag': ('tag', []),
+}
+
+# local start times of the buckets, since and before as for alert_makequery
+# raises ValueError for a bad time
+def histogram_buckets(since, before, interval):
+    start = datetime.datetime.fromtimestamp(alert_parsetime(since))
+    if before != None:
+        end = datetime.datetime.fromtimestamp(alert_parsetime(before))
+    else:
+        end = datetime.datetime.now()
+    step = HISTOGRAM_INTERVALS[interval]
+    buckets = []
+    while start < end:
+        buckets.append(start)
+        start = start + step
+    return buckets
+
+def histogram_label(bucket, interval):
+    if interval == 'hour':
+        return bucket.strftime('%Y-%m-%d %H:%M')
+    return bucket.strftime('%Y-%m-%d')
+
+@click.command()
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@click.option('--status', '-s')
+@click.option('--before')
+@click.option('--since', '--after', required=True)
+@click.option('--interval', '-i', type=click.Choice(['hour', 'day']), default='day')
+@click.option('--by', 'split', type=click.Choice(['status', 'priority', 'tag']), help='one column per value')
+@click.option('--tags', help='comma separated tags for --by tag')
+@click.option('--workers', default=8, help='count queries to run at the same time')
+@format_option
+def histogram(config, status, before, since, interval, split, tags, workers, outformat):
+    if split == 'tag' and tags == None:
+        click.echo('Must specify --tags option with --by tag')
+        return None
+    readConfig(config)
+    apiKey = getApiKey()
+    basequery = alert_makequery(status, None, None)
+    try:
+        buckets = histogram_buckets(since, before, interval)
+    except ValueError as exc:
+        click.echo('Error: ' + str(exc.args[0]))
+        return None
+    step = HISTOGRAM_INTERVALS[interval]
+
+    columns = ['count']
+    terms = [None]
+    if split != None:
+        field, columns = HISTOGRAM_SPLITS[split]
+        if split == 'tag':
+            columns = tags.split(',')
+        terms = [field + ':' + value for value in columns]
+
+    def bucket_query(bucket, term):
+        query = basequery
+        if term != None:
+            query = term if query == None else query + ' AND ' + term
+        return alert_rangequery(query, bucket.timestamp(), (bucket + step).timestamp())
+
+    getcount = withProfile(alerts_getcount)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [[executor.submit(getcount, apiKey, bucket_query(bucket, term)) for term in terms]
+                       for bucket in buckets]
+            counts = [[future.result() for future in row] for row in futures]
+    except Exception as exc:
+        click.echo('Error: opsgenie api returned error ' + str(exc.args))
+        return None
+
+    fields = ['bucket'] + columns
+    if split != None:
+        fields.append('total')
+    tableline = lambda rec: ' '.join(['%-16s' % rec['bucket']] + ['%10s' % rec[field] for field in fields[1:]])
+    writer = RecordWriter(outformat, fields, tableline)
+    writer.header(tableline({field: field for field in fields}))
+    res = []
+    for bucket, row in zip(buckets, counts):
+        rec = {'bucket': histogram_label(bucket, interval)}
+        for column, n in zip(columns, row):
+            rec[column] = n
+        if split != None:
+            rec['total'] = sum(row)
+        writer.write(rec)
+        res.append(rec)
+    writer.close()
+    return res
+
+
+alerts.add_command(count)
+alerts.add_command(list)
+alerts.add_command(delete)
+alerts.add_command(close)
+alerts.add_command(prune)
+alerts.add_command(histogram)
+alerts.add_command(archive)
+alerts.add_command(archivequery)
+alerts.add_command(dedup)
+
+if __name__ == '__main__':
+    alerts()
+
+    
+
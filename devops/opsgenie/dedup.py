@@ -0,0 +1,90 @@
+#
+# Alert fingerprints for storm deduplication
+#
+# Alerts raised by the same problem usually differ only in the ids,
+# timestamps, addresses and host names embedded in their text.  normalize()
+# replaces those with placeholders, so
+#
+#   'Disk 95% full on web-12.prod.example.com at 2018-12-01T10:22:33Z'
+#   'Disk 97% full on web-07.prod.example.com at 2018-12-01T10:25:01Z'
+#
+# both become 'disk #% full on <host> at <time>' and share a fingerprint.
+#
+
+import hashlib
+import re
+
+from devops.records import IdList
+
+NORMALIZE_PATTERNS = [
+    (re.compile(r'\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(z|[+-]\d{2}:?\d{2})?'), '<time>'),
+    (re.compile(r'\d{4}-\d{2}-\d{2}'), '<date>'),
+    (re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'), '<uuid>'),
+    (re.compile(r'\b\d{1,3}(\.\d{1,3}){3}(:\d+)?\b'), '<ip>'),
+    (re.compile(r'\b\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?\b'), '<time>'),
+    # 0x numbers, and hex runs of 6 or more with a digit so words like 'facade' survive
+    (re.compile(r'\b(0x[0-9a-f]+|(?=[0-9a-f]*\d)[0-9a-f]{6,})\b'), '<hex>'),
+    # dotted names with a digit somewhere, e.g. web-12.prod.example.com
+    (re.compile(r'\b[a-z0-9-]*\d[a-z0-9-]*(\.[a-z0-9-]+)+\b'), '<host>'),
+    (re.compile(r'\d+'), '#'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def normalize(text):
+    if text == None:
+        return ''
+    text = text.lower()
+    for pattern, placeholder in NORMALIZE_PATTERNS:
+        text = pattern.sub(placeholder, text)
+    return text.strip()
+
+def fingerprint(adata, fields):
+    text = '\x00'.join([normalize(adata.get(field)) for field in fields])
+    return hashlib.sha1(text.encode('utf-8')).digest()
+
+
+class Cluster:
+    __slots__ = ['text', 'keep', 'keepCreatedAt', 'ids']
+
+    def __init__(self, text):
+        self.text = text
+        self.keep = None
+        self.keepCreatedAt = None
+        # the others, packed
+        self.ids = IdList()
+
+    # the oldest alert of the cluster stays open
+    def add(self, adata):
+        if self.keep == None or adata['createdAt'] < self.keepCreatedAt:
+            if self.keep != None:
+                self.ids.append(self.keep)
+            self.keep = adata['id']
+            self.keepCreatedAt = adata['createdAt']
+        else:
+            self.ids.append(adata['id'])
+
+    def count(self):
+        return len(self.ids) + 1
+
+#
+# fingerprint -> Cluster for a stream of alerts
+#
+class ClusterStore:
+    def __init__(self, fields):
+        self.fields = fields
+        self.clusters = {}
+
+    def add(self, adata):
+        key = fingerprint(adata, self.fields)
+        cluster = self.clusters.get(key)
+        if cluster == None:
+            cluster = Cluster(normalize(adata.get(self.fields[0])))
+            self.clusters[key] = cluster
+        cluster.add(adata)
+
+    # clusters of at least minSize alerts, largest first
+    def storms(self, minSize):
+        res = [cluster for cluster in self.clusters.values() if cluster.count() >= minSize]
+        res.sort(key=lambda cluster: cluster.count(), reverse=True)
+        return res
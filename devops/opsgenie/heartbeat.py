@@ -0,0 +1,182 @@
+#
+# Manage OpsGenie Heartbeats in Bulk
+#
+# Author: Chris Maeda (cmaeda@cmaeda.com)
+
+import click
+import json
+
+# config module
+from devops.config import readConfig, getApiKey, OPSGENIE_FILE, OPSGENIE_SECTION
+from devops.client import getSession
+from devops.errors import rest_error
+from devops.cache import cached, invalidate, invalidate_endpoint
+from devops.output import RecordWriter, format_option
+from devops.plan import Plan, plan_options
+
+# implement heartbeat subcommands
+
+@cached('hb_getlist', OPSGENIE_SECTION)
+def hb_getlist(apiKey):
+    headers = {'Authorization': 'GenieKey ' + apiKey}
+    hblist = getSession().get('https://api.opsgenie.com/v2/heartbeats', headers=headers)
+    if hblist.status_code != 200:
+        raise rest_error(hblist)
+    hbjson = json.loads(hblist.text)
+    hbjsondata = hbjson['data']['heartbeats']
+    return hbjsondata
+
+# Get a heartbeat record
+# See https://docs.opsgenie.com/docs/heartbeat-api#section-get-heartbeat-request
+@cached('hb_get', OPSGENIE_SECTION)
+def hb_get(apiKey, name):
+    headers = {'Authorization': 'GenieKey ' + apiKey}
+    hblist = getSession().get('https://api.opsgenie.com/v2/heartbeats/' + name , headers=headers)
+    if hblist.status_code != 200:
+        raise rest_error(hblist)
+    hbjson = json.loads(hblist.text)
+    hbjsondata = hbjson['data']
+    return hbjsondata
+    
+def hb_patch(apiKey, name, timeout):
+    patch = { 'interval': str(timeout) }
+    patchjson = json.dumps(patch)
+    headers = {'Authorization': 'GenieKey ' + apiKey, 'Content-Type': 'application/json'}
+    hbresult = getSession().patch('https://api.opsgenie.com/v2/heartbeats/' + name, headers=headers, data=patchjson)
+    if hbresult.status_code != 200:
+        raise rest_error(hbresult)
+    invalidate('hb_get', OPSGENIE_SECTION, apiKey, name)
+    invalidate_endpoint('hb_getlist')
+    hbjson = json.loads(hbresult.text)
+    hbjsondata = hbjson['data']
+    return hbjsondata
+
+
+@click.group()
+def heartbeat():
+    pass
+
+# csv columns and table lines for heartbeat records
+HB_FIELDS = ['name', 'description', 'interval', 'intervalUnit', 'enabled', 'expired', 'ownerTeam']
+
+def hb_tableline(hbdef):
+    return 'Name: ' + hbdef['name'] + ' interval:' + str(hbdef['interval'])
+
+def hb_statusline(hbdata):
+    if hbdata['expired']:
+        return 'Expired: ' + hbdata['name'] + ' interval:' + str(hbdata['interval'])
+    return 'Healthy: ' + hbdata['name'] + ' interval:' + str(hbdata['interval'])
+
+@click.command()
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@format_option
+def list(config, outformat):
+    readConfig(config)
+    apiKey = getApiKey()
+    try:
+        hbjson = hb_getlist(apiKey)
+    except Exception as exc:
+        click.echo('Error: opsgenie api returned error ' + str(exc.args))
+        return None
+    writer = RecordWriter(outformat, HB_FIELDS, hb_tableline)
+    writer.header('Heartbeat Count ' + str(len(hbjson)))
+    for hbdef in hbjson:
+        writer.write(hbdef)
+    writer.close()
+    return hbjson
+
+@click.command()
+@click.argument('prefix')
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@click.option('--showall', '-a')
+@format_option
+def status(prefix, config, showall, outformat):
+    readConfig(config)
+    apiKey = getApiKey()
+    try:
+        hbjson = hb_getlist(apiKey)
+    except Exception as exc:
+        click.echo('Error: opsgenie api returned error ' + str(exc.args))
+        return None
+    writer = RecordWriter(outformat, HB_FIELDS, hb_statusline)
+    for hbdef in hbjson:
+        hbname = hbdef['name']
+        if not hbname.startswith(prefix):
+            continue
+        # api limits are retried with backoff by devops.retry
+        try:
+            hbdata = hb_get(apiKey, hbname)
+        except Exception as exc:
+            writer.close()
+            click.echo('Error: opsgenie api returned error ' + str(exc.args))
+            return None
+        hbexpired = hbdata['expired']
+        if hbexpired or showall == 'true':
+            hbdata['interval'] = hbdef['interval']
+            writer.write(hbdata)
+    writer.close()
+    return hbjson
+
+#
+# bulk update on heartbeats matching prefix
+#
+@click.command()
+@click.argument('prefix')
+@click.option('--config', '-c', default=OPSGENIE_FILE)
+@click.option('--timeout', '-t')
+@plan_options
+def bulkset(prefix, config, timeout, plan, planrate):
+    if timeout == None:
+        click.echo('Must specify --timeout option in minutes')
+        return None
+    timeout = int(timeout)
+    readConfig(config)
+    apiKey = getApiKey()
+    if plan:
+        return bulkset_plan(apiKey, prefix, timeout, planrate)
+    click.echo('[ bulkset prefix=' + prefix + ' timeout=' + str(timeout) + ' ]')
+    try:
+        hbjson = hb_getlist(apiKey)
+    except Exception as exc:
+        click.echo('Error: opsgenie api returned error ' + str(exc.args))
+        return None
+    click.echo('Heartbeat Count ' + str(len(hbjson)))
+    for hbdef in hbjson:
+        hbname = hbdef['name']
+        if not hbname.startswith(prefix):
+            # skip non-matching heartbeat record
+            continue
+        hbtimeout = hbdef['interval']
+        if hbtimeout != timeout:
+            # api limits are retried with backoff by devops.retry
+            try:
+                hbres = hb_patch(apiKey, hbname, timeout)
+                click.echo('HB ' + hbname + ' timeout old:' + str(hbtimeout) + ' new:' + str(timeout))
+            except Exception as exc:
+                click.echo('Error: opsgenie api returned error ' + str(exc.args))
+                return None
+    return hbjson
+
+# the heartbeat list is the count: one patch per matching heartbeat with another interval
+def bulkset_plan(apiKey, prefix, timeout, planrate):
+    pln = Plan('heartbeat bulkset', 'opsgenie', planrate)
+    try:
+        hbjson = pln.query(hb_getlist, apiKey)
+    except Exception as exc:
+        click.echo('Error: opsgenie api returned error ' + str(exc.args))
+        return None
+    pln.records = len([hbdef for hbdef in hbjson
+                       if hbdef['name'].startswith(prefix) and hbdef['interval'] != timeout])
+    pln.calls('GET /v2/heartbeats', 1)
+    pln.calls('PATCH /v2/heartbeats/{id}', pln.records)
+    pln.hold('heartbeat', len(hbjson))
+    pln.echo()
+    return pln.records
+
+
+heartbeat.add_command(list)
+heartbeat.add_command(bulkset)
+heartbeat.add_command(status)
+
+if __name__ == '__main__':
+    heartbeat()
@@ -0,0 +1,132 @@
+#
+# Prune rules for OpsGenie alerts
+#
+# A rules file lists known-noise alert signatures, one section per rule:
+#
+#   [api-limit]
+#   match.description = You are making too many requests!
+#   action = close
+#   note = Close Api Limit Alert
+#
+#   [test-disks]
+#   regex.message = ^Disk usage [0-9]+% on test-
+#   match.tags = noisy
+#   action = delete
+#
+# match.FIELD is a substring and regex.FIELD a regular expression, tested
+# against any alert field (alias, message, source, tags, priority,
+# description, ...).  List fields like tags are tested one value per line.
+# All conditions of a rule must match.  The first matching rule in file
+# order decides the action: close (with the rule's note), delete or ack.
+#
+# Every condition is compiled once when the rules are read.  An alert's
+# fields are turned into text once and tested against the rules in order,
+# each rule stopping at its first failing condition, so the alert feed is
+# read once however many rules there are.
+#
+
+import configparser
+import re
+
+RULE_ACTIONS = ['close', 'delete', 'ack']
+
+# fields returned by the alert list api, others need a get per alert
+LIST_FIELDS = set(['id', 'tinyId', 'alias', 'message', 'status', 'acknowledged', 'isSeen', 'tags',
+                   'snoozed', 'count', 'lastOccurredAt', 'createdAt', 'updatedAt', 'source',
+                   'owner', 'priority', 'teams', 'responders', 'integration', 'report'])
+
+# the check prune has always made
+DEFAULT_RULES = """
+[api-limit]
+match.description = You are making too many requests!
+action = close
+note = Close Api Limit Alert
+"""
+
+
+class Rule:
+    def __init__(self, name, action, note):
+        self.name = name
+        self.action = action
+        self.note = note
+        # (field, compiled regex) for each condition
+        self.conditions = []
+
+    def matches(self, texts, adata):
+        for field, regex in self.conditions:
+            if field not in texts:
+                texts[field] = field_text(adata.get(field))
+            if regex.search(texts[field]) == None:
+                return False
+        return True
+
+
+class RuleSet:
+    def __init__(self, rules):
+        self.rules = rules
+        self.fields = set([field for rule in rules for field, regex in rule.conditions])
+        self.hits = {rule.name: 0 for rule in rules}
+
+    # True if some rule tests a field the alert list doesn't return
+    def needs_details(self):
+        return any(field not in LIST_FIELDS for field in self.fields)
+
+    #
+    # first rule matching adata, or None
+    #
+    def match(self, adata):
+        # field texts of this alert, made on first use
+        texts = {}
+        for rule in self.rules:
+            if rule.matches(texts, adata):
+                self.hits[rule.name] = self.hits[rule.name] + 1
+                return rule
+        return None
+
+
+def field_text(value):
+    if value == None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return '\n'.join([str(item) for item in value])
+    return str(value)
+
+#
+# compile rules from INI text
+# raises Exception('bad rule', name, reason) for an invalid rule
+#
+def rules_parse(text):
+    parser = configparser.ConfigParser(interpolation=None)
+    # keep field names like tinyId as written
+    parser.optionxform = str
+    parser.read_string(text)
+    rules = []
+    for name in parser.sections():
+        section = parser[name]
+        action = section.get('action', 'close')
+        if action not in RULE_ACTIONS:
+            raise Exception('bad rule', name, 'unknown action ' + action)
+        rule = Rule(name, action, section.get('note'))
+        for key, value in section.items():
+            if key.startswith('match.'):
+                pattern = re.escape(value)
+            elif key.startswith('regex.'):
+                pattern = value
+            else:
+                continue
+            try:
+                # ^ and $ also match at every value of a list field
+                regex = re.compile(pattern, re.MULTILINE)
+            except re.error as exc:
+                raise Exception('bad rule', name, key + ': ' + str(exc))
+            rule.conditions.append((key.split('.', 1)[1], regex))
+        if len(rule.conditions) == 0:
+            raise Exception('bad rule', name, 'no match. or regex. conditions')
+        rules.append(rule)
+    return RuleSet(rules)
+
+def rules_read(filename):
+    if filename == None:
+        return rules_parse(DEFAULT_RULES)
+    with open(filename) as rulesfile:
+        return rules_parse(rulesfile.read())
@@ -0,0 +1,75 @@
+#
+# Watermarks for incremental alert jobs
+#
+# A cron job that runs alerts list or prune with --state FILE only looks at
+# alerts that occurred after the previous run.  The state file keeps, per
+# job, the latest lastOccurredAt seen and the ids of the alerts at exactly
+# that time:
+#
+#   {"prune open default": {"time": 1543659753.123, "ids": ["id1", "id2"]}}
+#
+# Queries start at the watermark second (the search api works in seconds),
+# and the boundary ids keep alerts at the watermark from being handled twice.
+# An alert that occurs again gets a later lastOccurredAt and is new again.
+#
+
+import datetime
+import json
+import os
+
+# config module
+from devops.config import getProfile
+
+
+# unix time of an alert's lastOccurredAt (or another time field), e.g. '2018-12-01T10:22:33.123Z'
+def alert_time(adata, field='lastOccurredAt'):
+    text = adata[field].replace('Z', '+00:00')
+    return datetime.datetime.fromisoformat(text).timestamp()
+
+
+class Watermark:
+    def __init__(self, filename, job):
+        self.filename = os.path.expanduser(filename)
+        self.key = job + ' ' + getProfile()
+        entry = self.read().get(self.key, {})
+        self.time = entry.get('time')
+        self.ids = set(entry.get('ids', []))
+        self.newTime = self.time
+        self.newIds = set(self.ids)
+
+    def read(self):
+        if not os.path.exists(self.filename):
+            return {}
+        with open(self.filename) as statefile:
+            return json.load(statefile)
+
+    # start of the query window: the watermark second, or since on the first run
+    def since(self, since):
+        if self.time == None:
+            return since
+        return int(self.time)
+
+    def is_new(self, adata):
+        if self.time == None:
+            return True
+        t = alert_time(adata)
+        return t > self.time or (t == self.time and adata['id'] not in self.ids)
+
+    def advance(self, adata):
+        t = alert_time(adata)
+        if self.newTime == None or t > self.newTime:
+            self.newTime = t
+            self.newIds = set([adata['id']])
+        elif t == self.newTime:
+            self.newIds.add(adata['id'])
+
+    # write the new watermark, keeping the other jobs' entries
+    def save(self):
+        if self.newTime == None:
+            return
+        state = self.read()
+        state[self.key] = {'time': self.newTime, 'ids': sorted(self.newIds)}
+        tmpname = self.filename + '.tmp'
+        with open(tmpname, 'w') as statefile:
+            json.dump(state, statefile, indent=1)
+        os.replace(tmpname, self.filename)
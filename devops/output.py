@@ -0,0 +1,107 @@
+#
+# devops output
+#
+# Record writer behind the --format option of the list and status commands.
+#
+#   table   the human readable lines each command has always printed
+#   ndjson  one JSON object per record
+#   csv     one row per record with a header row of the command's fields
+#
+# Records are written as soon as the command has fetched them, through a
+# small buffer so stdout sees a few large writes instead of one per line.
+# orjson is used to encode JSON when it is installed.
+#
+# When a command runs against several profiles, ndjson and csv records get
+# a leading 'profile' field so the merged stream stays machine readable.
+#
+
+import click
+import csv
+import io
+import json
+
+from devops.profiles import fanout_profile, set_raw_output
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMATS = ['table', 'ndjson', 'csv']
+
+# records buffered before a write to stdout
+BUFFER_RECORDS = 100
+
+
+def dumps(record):
+    if orjson != None:
+        return orjson.dumps(record).decode('utf-8')
+    return json.dumps(record, separators=(',', ':'))
+
+#
+# click option shared by the list commands
+#
+def format_option(func):
+    return click.option('--format', 'outformat', type=click.Choice(FORMATS), default='table',
+                        help='output format')(func)
+
+#
+# tableline(record) returns the text printed for a record in table format.
+# fields are the csv columns; nested values are written as JSON.
+#
+class RecordWriter:
+    def __init__(self, outformat, fields, tableline):
+        self.outformat = outformat
+        self.fields = fields
+        self.tableline = tableline
+        self.buffer = io.StringIO()
+        self.pending = 0
+        self.count = 0
+        self.csvwriter = None
+        self.profile = fanout_profile()
+        if self.profile != None and outformat != 'table':
+            set_raw_output()
+            self.fields = ['profile'] + fields
+        if outformat == 'csv':
+            self.csvwriter = csv.writer(self.buffer, lineterminator='\n')
+            self.csvwriter.writerow(self.fields)
+
+    # summary lines like 'Count 5' only belong in table output
+    def header(self, text):
+        if self.outformat == 'table':
+            self.buffer.write(text + '\n')
+
+    def write(self, record):
+        if self.profile != None and self.outformat != 'table':
+            record = dict(record)
+            record['profile'] = self.profile
+        if self.outformat == 'ndjson':
+            self.buffer.write(dumps(record) + '\n')
+        elif self.outformat == 'csv':
+            self.csvwriter.writerow([self.csvvalue(record.get(field)) for field in self.fields])
+        else:
+            self.buffer.write(self.tableline(record) + '\n')
+        self.count = self.count + 1
+        self.pending = self.pending + 1
+        if self.pending >= BUFFER_RECORDS:
+            self.flush()
+
+    def csvvalue(self, value):
+        if value == None:
+            return ''
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, (dict, list)):
+            return dumps(value)
+        return value
+
+    def flush(self):
+        text = self.buffer.getvalue()
+        if len(text) > 0:
+            click.echo(text, nl=False)
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.pending = 0
+
+    def close(self):
+        self.flush()
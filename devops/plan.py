@@ -0,0 +1,125 @@
+#
+# devops plan
+#
+# Dry run estimates for the bulk commands (alerts close, delete and prune,
+# heartbeat bulkset, procdef deleteinstances).  With --plan a command only
+# makes its count (or list) queries and prints what the run would do:
+#
+#   Plan alerts delete
+#   Records 12000
+#   Calls GET /v2/alerts 120
+#   Calls DELETE /v2/alerts/{id} 12000
+#   Round trip 0.180s measured
+#   Wall time 20m 12s at 10 calls/s
+#   Peak memory 0.5 MB
+#   No changes made
+#
+# Wall time: the calls of each step are spread over its workers, one round
+# trip per call, and made no faster than the rate limit.  The round trip is
+# the average time of the queries the plan made.  Retries and 429 backoff
+# come on top.  Peak memory counts the records the command holds at once,
+# at RECORD_BYTES each.
+#
+
+import click
+import math
+import time
+
+# calls per second allowed by the api, None for no limit.  OpsGenie limits
+# depend on the account plan, see --plan-rate.
+RATE_LIMITS = {'opsgenie': 10.0, 'camunda': None}
+
+# round trip used when the plan made no queries, e.g. on --resume
+DEFAULT_ROUNDTRIP = 0.2
+
+# rough memory per record once parsed from JSON, or kept as a compact
+# record or packed id (see devops.records), in bytes
+RECORD_BYTES = {
+    'id': 100,
+    'packed id': 17,
+    'definition record': 200,
+    'alert': 3000,
+    'alert details': 5000,
+    'heartbeat': 800,
+    'definition': 1000,
+    'instance': 800,
+}
+
+
+def plan_options(func):
+    func = click.option('--plan-rate', 'planrate', type=float,
+                        help='calls per second the api allows, for --plan')(func)
+    func = click.option('--plan', 'plan', is_flag=True,
+                        help='estimate calls, time and memory without changing anything')(func)
+    return func
+
+
+class Plan:
+    def __init__(self, command, api, rate=None):
+        self.command = command
+        self.rate = rate if rate != None else RATE_LIMITS[api]
+        self.records = 0
+        # (endpoint, calls, workers, upto)
+        self.steps = []
+        # record kind -> records held at once
+        self.held = {}
+        self.queries = 0
+        self.querySeconds = 0.0
+
+    # run a read-only query, timing it for the round trip
+    def query(self, func, *args):
+        start = time.perf_counter()
+        res = func(*args)
+        self.querySeconds = self.querySeconds + time.perf_counter() - start
+        self.queries = self.queries + 1
+        return res
+
+    # calls of one step, upto for calls that depend on what the run finds
+    def calls(self, endpoint, calls, workers=1, upto=False):
+        self.steps.append((endpoint, calls, workers, upto))
+
+    def hold(self, kind, count):
+        self.held[kind] = self.held.get(kind, 0) + count
+
+    def roundtrip(self):
+        if self.querySeconds == 0:
+            return DEFAULT_ROUNDTRIP
+        return self.querySeconds / self.queries
+
+    def wall_seconds(self):
+        total = 0.0
+        for endpoint, calls, workers, upto in self.steps:
+            persecond = workers / self.roundtrip()
+            if self.rate != None:
+                persecond = min(persecond, self.rate)
+            total = total + calls / persecond
+        return total
+
+    def memory_bytes(self):
+        return sum(RECORD_BYTES[kind] * count for kind, count in self.held.items())
+
+    def echo(self):
+        click.echo('Plan ' + self.command)
+        click.echo('Records ' + str(self.records))
+        upto = False
+        for endpoint, calls, workers, stepupto in self.steps:
+            line = 'Calls ' + endpoint + (' up to ' if stepupto else ' ') + str(calls)
+            if workers > 1:
+                line = line + ' with ' + str(workers) + ' workers'
+            click.echo(line)
+            upto = upto or stepupto
+        if self.querySeconds > 0:
+            click.echo('Round trip %.3fs measured' % self.roundtrip())
+        else:
+            click.echo('Round trip %.3fs assumed' % self.roundtrip())
+        limit = ' at %g calls/s' % self.rate if self.rate != None else ''
+        click.echo('Wall time ' + ('up to ' if upto else '') + duration_text(self.wall_seconds()) + limit)
+        click.echo('Peak memory %.1f MB' % (self.memory_bytes() / 1000000.0))
+        click.echo('No changes made')
+
+
+def duration_text(seconds):
+    seconds = int(math.ceil(seconds))
+    if seconds >= 3600:
+        return '%dh %dm %ds' % (seconds // 3600, seconds % 3600 // 60, seconds % 60)
+    return '%dm %ds' % (seconds // 60, seconds % 60)
@@ -0,0 +1,124 @@
+#
+# devops profiles
+#
+# Run one command against several profiles (Camunda engines or OpsGenie
+# accounts) at the same time.  Each profile runs in its own thread with
+# its own pooled session, and its output is collected so the results of
+# all profiles can be printed as one report.
+#
+
+import click
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# config module
+from devops.config import useProfile
+from devops.records import IdList
+
+# fan-out state of the current thread, see fanout_profile
+my_fanout = threading.local()
+
+#
+# profile name when running under run_profiles, else None
+#
+def fanout_profile():
+    return getattr(my_fanout, 'profile', None)
+
+#
+# machine readable output is reported without the profile prefix
+#
+def set_raw_output():
+    my_fanout.raw = True
+
+#
+# stdout replacement that sends the output of each profile thread to its
+# own buffer; threads without a buffer write straight through
+#
+class ThreadOutput:
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        if buffer == None:
+            return self.stream.write(text)
+        return buffer.write(text)
+
+    def flush(self):
+        if getattr(self.local, 'buffer', None) == None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+#
+# call func once per profile, concurrently
+# returns a list of (profile, result, output, error, raw) in profile order
+#
+def run_profiles(profiles, workers, func):
+    output = ThreadOutput(sys.stdout)
+
+    def run(profile):
+        output.local.buffer = io.StringIO()
+        my_fanout.profile = profile
+        my_fanout.raw = False
+        res = None
+        error = None
+        try:
+            with useProfile(profile):
+                res = func()
+        except Exception as exc:
+            error = exc
+        text = output.local.buffer.getvalue()
+        output.local.buffer = None
+        my_fanout.profile = None
+        return profile, res, text, error, my_fanout.raw
+
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            res = [r for r in executor.map(run, profiles)]
+    finally:
+        sys.stdout = output.stream
+    return res
+
+#
+# print the output of every profile prefixed with its name, then a summary.
+# Counts (plain or camunda style {'count': n}) are summed and lists are
+# totalled by length.
+# Raw (ndjson/csv) output is printed as is, with a repeated csv header
+# dropped, and the summary goes to stderr to keep the stream parseable.
+#
+def echo_report(results):
+    total = 0
+    failed = 0
+    anyraw = False
+    rawheader = None
+    for profile, res, text, error, raw in results:
+        lines = text.splitlines()
+        if raw:
+            anyraw = True
+            if rawheader == None and len(lines) > 0:
+                rawheader = lines[0]
+            elif len(lines) > 0 and lines[0] == rawheader:
+                lines = lines[1:]
+        for line in lines:
+            if raw:
+                click.echo(line)
+            else:
+                click.echo(profile + ': ' + line)
+        if error != None:
+            failed = failed + 1
+            click.echo(profile + ': Error: ' + str(error), err=anyraw)
+        elif res == None:
+            failed = failed + 1
+        elif isinstance(res, (int, float)) and not isinstance(res, bool):
+            total = total + res
+        elif isinstance(res, dict) and 'count' in res:
+            total = total + res['count']
+        elif isinstance(res, (list, tuple, dict, IdList)):
+            total = total + len(res)
+    click.echo('Profiles ' + str(len(results)) + ' failed:' + str(failed) + ' total:' + str(total), err=anyraw)
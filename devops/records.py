@@ -0,0 +1,132 @@
+#
+# devops records
+#
+# Compact in-memory records for commands that keep scan results around,
+# e.g. the instance ids of procdef deleteinstances or the alert clusters of
+# alerts dedup.  A parsed JSON object costs a dict plus a string object per
+# value, 1-3 KB per alert or process instance.
+#
+# record_type() makes a slotted class that keeps only the fields a command
+# needs.  Values of the interned fields (tenant ids, definition keys,
+# statuses, priorities) repeat across records, so every record shares one
+# copy of each.  Records can be read like the dicts they came from:
+#
+#   ProcdefRecord = record_type('ProcdefRecord', ['id', 'key', 'version'], interned=['key'])
+#   adef = ProcdefRecord.from_json(respjson[0])
+#   adef['key'], adef.get('tenantId'), adef.version
+#
+# IdList holds ids in UUID form (alert, process instance and job ids) as
+# 16 packed bytes each instead of a 36 character string, about 90 bytes.
+# It falls back to a plain list as soon as an id is not a canonical UUID.
+#
+
+import sys
+import uuid
+
+ID_BYTES = 16
+
+
+class Record:
+    __slots__ = ()
+    fields = ()
+    interned = frozenset()
+
+    @classmethod
+    def from_json(cls, adata):
+        record = cls()
+        for field in cls.fields:
+            value = adata.get(field)
+            if field in cls.interned and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(record, field, value)
+        return record
+
+    def __getitem__(self, field):
+        if field not in self.fields:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def get(self, field, default=None):
+        if field not in self.fields:
+            return default
+        return getattr(self, field)
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.fields}
+
+    def __repr__(self):
+        return type(self).__name__ + repr(self.as_dict())
+
+#
+# slotted Record class keeping fields, with the values of interned fields
+# shared between records
+#
+def record_type(name, fields, interned=()):
+    return type(name, (Record,), {'__slots__': tuple(fields), 'fields': tuple(fields),
+                                  'interned': frozenset(interned)})
+
+
+# 16 bytes for an id in canonical UUID form, None for any other id
+def pack_id(id):
+    if not isinstance(id, str) or len(id) != 36:
+        return None
+    try:
+        value = uuid.UUID(id)
+    except ValueError:
+        return None
+    if str(value) != id:
+        return None
+    return value.bytes
+
+
+class IdList:
+    def __init__(self, ids=()):
+        self.packed = bytearray()
+        # plain list, once an id didn't pack
+        self.ids = None
+        self.extend(ids)
+
+    def append(self, id):
+        if self.ids == None:
+            packed = pack_id(id)
+            if packed != None:
+                self.packed.extend(packed)
+                return
+            self.ids = self.tolist()
+            self.packed = bytearray()
+        self.ids.append(id)
+
+    def extend(self, ids):
+        for id in ids:
+            self.append(id)
+
+    def __len__(self):
+        if self.ids != None:
+            return len(self.ids)
+        return len(self.packed) // ID_BYTES
+
+    # an id, or a plain list of ids for a slice
+    def __getitem__(self, index):
+        if self.ids != None:
+            return self.ids[index]
+        if isinstance(index, slice):
+            return [self.unpack(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index = index + len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('IdList index out of range')
+        return self.unpack(index)
+
+    def unpack(self, index):
+        start = index * ID_BYTES
+        return str(uuid.UUID(bytes=bytes(self.packed[start:start + ID_BYTES])))
+
+    def __iter__(self):
+        if self.ids != None:
+            return iter(self.ids)
+        return (self.unpack(i) for i in range(len(self)))
+
+    def tolist(self):
+        if self.ids != None:
+            return [id for id in self.ids]
+        return [self.unpack(i) for i in range(len(self))]
@@ -0,0 +1,169 @@
+#
+# devops retry
+#
+# Resilience layer under every REST call made through devops.client.
+#
+# Retries
+#   429 responses and failed connections are retried for every method.
+#   502/503/504 responses and other connection errors are only retried for
+#   idempotent methods, so a POST that may have been applied is not repeated.
+#   The wait is exponential backoff with full jitter, or the Retry-After
+#   header when the server sends one.
+#
+# Circuit breaker
+#   One breaker per host.  After BREAKER_THRESHOLD failures in a row
+#   (5xx, no connection or a broken response) the breaker opens and every
+#   worker thread talking to that host waits BREAKER_COOLDOWN seconds.  Then
+#   a single probe request goes through; success closes the breaker, failure
+#   opens it again.
+#
+# Waits are recorded as retry waits in devops.stats.
+#
+
+import email.utils
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+from devops import stats
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+IDEMPOTENT_METHODS = set(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+RETRY_STATUS = set([502, 503, 504])
+
+my_retries = MAX_RETRIES
+my_breakers = {}
+my_lock = threading.Lock()
+
+
+def set_retries(retries):
+    global my_retries
+    my_retries = retries
+
+
+class CircuitBreaker:
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.openUntil = 0.0
+        self.probing = False
+        self.cond = threading.Condition()
+
+    # block while the breaker is open, returns the seconds waited
+    def before(self):
+        if self.failures < self.threshold:
+            return 0.0
+        start = time.monotonic()
+        with self.cond:
+            while self.failures >= self.threshold:
+                now = time.monotonic()
+                if now < self.openUntil:
+                    self.cond.wait(self.openUntil - now)
+                elif not self.probing:
+                    self.probing = True
+                    break
+                else:
+                    # another thread is probing, wait for its result
+                    self.cond.wait(1.0)
+        return time.monotonic() - start
+
+    def success(self):
+        with self.cond:
+            self.failures = 0
+            self.probing = False
+            self.cond.notify_all()
+
+    def failure(self):
+        with self.cond:
+            self.failures = self.failures + 1
+            self.probing = False
+            if self.failures >= self.threshold:
+                self.openUntil = time.monotonic() + self.cooldown
+            self.cond.notify_all()
+
+
+def breaker_for(url):
+    host = urlparse(url).netloc
+    with my_lock:
+        if host not in my_breakers:
+            my_breakers[host] = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+        return my_breakers[host]
+
+#
+# seconds to wait before retry number attempt (0 based)
+#
+def backoff_delay(attempt, retryAfter=None):
+    if retryAfter != None:
+        return min(retryAfter, BACKOFF_MAX) + random.uniform(0, BACKOFF_BASE)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+#
+# Retry-After in seconds, given as seconds or as an http date
+#
+def retry_after(response):
+    value = response.headers.get('Retry-After')
+    if value == None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def wait(seconds):
+    stats.record_retry_wait(seconds)
+    time.sleep(seconds)
+
+#
+# call send(request) with retries, returns the last response or raises
+# the last connection error
+#
+def send_with_retry(request, send):
+    # imported here, the cli imports this module before any command needs requests
+    from requests.exceptions import ConnectionError, ConnectTimeout
+    from urllib3.exceptions import NewConnectionError
+    breaker = breaker_for(request.url)
+    idempotent = request.method in IDEMPOTENT_METHODS
+    attempt = 0
+    while True:
+        waited = breaker.before()
+        if waited > 0:
+            stats.record_retry_wait(waited)
+        try:
+            response = send(request)
+        except ConnectionError as exc:
+            breaker.failure()
+            # a refused or timed out connect never reached the server
+            reason = getattr(exc.args[0], 'reason', None) if len(exc.args) > 0 else None
+            safe = idempotent or isinstance(exc, ConnectTimeout) or isinstance(reason, NewConnectionError)
+            if attempt >= my_retries or not safe:
+                raise
+            wait(backoff_delay(attempt))
+            attempt = attempt + 1
+            continue
+        except BaseException:
+            # e.g. a read timeout or a cut off body, the breaker must not stay probing
+            breaker.failure()
+            raise
+        if response.status_code >= 500:
+            breaker.failure()
+        else:
+            breaker.success()
+        retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUS)
+        if not retryable or attempt >= my_retries:
+            return response
+        # read the error body so the connection goes back to the pool
+        response.content
+        wait(backoff_delay(attempt, retry_after(response)))
+        attempt = attempt + 1
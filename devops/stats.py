@@ -0,0 +1,206 @@
+#
+# devops request stats
+#
+# Hook layer around every REST call made through devops.client.  Hooks
+# are called with (request, response, seconds, error) after each call;
+# response is None and error is set when the call raised.
+#
+# Two hooks are provided:
+#
+#   stats_hook   per-endpoint counts, latency histogram, bytes, 429/5xx
+#                counts and retry waits, printed by echo_stats (--stats) or
+#                written as JSON by write_stats_json (--stats-json)
+#   TraceWriter  one JSON line per request to a trace file (--trace)
+#
+# Endpoints are named by method and path with ids replaced by {id}, e.g.
+# 'GET /engine/default/process-definition/{id}'.
+#
+
+import click
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+# config module
+from devops.config import getProfile
+
+# upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# path segments that are part of an endpoint name, anything else is an id
+PATH_WORDS = set([
+    'engine', 'default', 'deployment', 'create', 'process-definition', 'history-time-to-live',
+    'process-instance', 'job', 'retries', 'history', 'cleanup', 'configuration',
+    'activity-instance', 'variable-instance', 'batch', 'statistics', 'migration', 'generate',
+    'executeAsync', 'count', 'delete', 'key', 'tenant-id',
+    'v2', 'alerts', 'heartbeats', 'close', 'acknowledge', 'notes', 'requests',
+])
+
+my_hooks = []
+my_stats = {}
+my_lock = threading.Lock()
+
+# endpoint of the last call made by this thread, retry waits are charged to it
+my_last = threading.local()
+
+
+class EndpointStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.maxSeconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.bytesSent = 0
+        self.bytesReceived = 0
+        self.status429 = 0
+        self.status5xx = 0
+        self.errors = 0
+        self.retries = 0
+        self.retrySeconds = 0.0
+
+    # latency below which fraction of the calls finished, from the histogram
+    def percentile(self, fraction):
+        target = self.count * fraction
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen = seen + n
+            if seen >= target and n > 0:
+                return min(LATENCY_BUCKETS[i], self.maxSeconds) if i < len(LATENCY_BUCKETS) else self.maxSeconds
+        return self.maxSeconds
+
+
+def add_hook(func):
+    with my_lock:
+        my_hooks.append(func)
+
+def remove_hook(func):
+    with my_lock:
+        my_hooks.remove(func)
+
+def hooks_enabled():
+    return len(my_hooks) > 0
+
+def endpoint_name(method, url):
+    path = urlparse(url).path
+    # camunda rest base urls can have any prefix before /engine/
+    pos = path.find('/engine/')
+    if pos > 0:
+        path = path[pos:]
+    segments = [seg if seg in PATH_WORDS else '{id}' for seg in path.split('/') if seg != '']
+    return method + ' /' + '/'.join(segments)
+
+def body_length(body):
+    if body == None:
+        return 0
+    try:
+        return len(body)
+    except TypeError:
+        return 0
+
+#
+# called by the client after every request
+#
+def dispatch(request, response, seconds, error):
+    for hook in [h for h in my_hooks]:
+        hook(request, response, seconds, error)
+
+#
+# record time spent waiting before retrying the last call of this thread
+#
+def record_retry_wait(seconds):
+    if stats_hook not in my_hooks:
+        return
+    endpoint = getattr(my_last, 'endpoint', 'unknown')
+    with my_lock:
+        stats = my_stats.setdefault(endpoint, EndpointStats())
+        stats.retries = stats.retries + 1
+        stats.retrySeconds = stats.retrySeconds + seconds
+
+def stats_hook(request, response, seconds, error):
+    endpoint = endpoint_name(request.method, request.url)
+    my_last.endpoint = endpoint
+    with my_lock:
+        stats = my_stats.setdefault(endpoint, EndpointStats())
+        stats.count = stats.count + 1
+        stats.seconds = stats.seconds + seconds
+        stats.maxSeconds = max(stats.maxSeconds, seconds)
+        bucket = len(LATENCY_BUCKETS)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                bucket = i
+                break
+        stats.buckets[bucket] = stats.buckets[bucket] + 1
+        stats.bytesSent = stats.bytesSent + body_length(request.body)
+        if error != None:
+            stats.errors = stats.errors + 1
+            return
+        stats.bytesReceived = stats.bytesReceived + len(response.content)
+        if response.status_code == 429:
+            stats.status429 = stats.status429 + 1
+        elif response.status_code >= 500:
+            stats.status5xx = stats.status5xx + 1
+
+def enable_stats():
+    add_hook(stats_hook)
+
+#
+# print the per-endpoint summary, slowest endpoints first.
+# Goes to stderr so it can be combined with machine readable output.
+#
+def echo_stats():
+    with my_lock:
+        rows = sorted(my_stats.items(), key=lambda item: item[1].seconds, reverse=True)
+    if len(rows) == 0:
+        return
+    click.echo('%8s %9s %8s %8s %8s %9s %9s %5s %5s %5s %7s %8s  %s' % (
+        'calls', 'total s', 'mean ms', 'p50 ms', 'p95 ms', 'max ms', 'KiB in', '429', '5xx', 'err',
+        'retries', 'wait s', 'endpoint'), err=True)
+    for endpoint, stats in rows:
+        mean = stats.seconds / stats.count if stats.count > 0 else 0.0
+        click.echo('%8d %9.3f %8.1f %8.1f %8.1f %9.1f %9.1f %5d %5d %5d %7d %8.1f  %s' % (
+            stats.count, stats.seconds, mean * 1000, stats.percentile(0.5) * 1000,
+            stats.percentile(0.95) * 1000, stats.maxSeconds * 1000, stats.bytesReceived / 1024.0,
+            stats.status429, stats.status5xx, stats.errors, stats.retries, stats.retrySeconds,
+            endpoint), err=True)
+
+# per-endpoint summary as a dict, histogram buckets keyed by upper bound
+def stats_json():
+    with my_lock:
+        return {endpoint: {
+            'calls': stats.count, 'seconds': stats.seconds, 'maxSeconds': stats.maxSeconds,
+            'latencyBuckets': {str(bound): n for bound, n in zip(LATENCY_BUCKETS + ['inf'], stats.buckets)},
+            'bytesSent': stats.bytesSent, 'bytesReceived': stats.bytesReceived,
+            'status429': stats.status429, 'status5xx': stats.status5xx, 'errors': stats.errors,
+            'retries': stats.retries, 'retrySeconds': stats.retrySeconds,
+        } for endpoint, stats in my_stats.items()}
+
+def write_stats_json(filename):
+    with open(filename, 'w') as statsfile:
+        json.dump(stats_json(), statsfile, indent=2, sort_keys=True)
+
+#
+# hook that appends one JSON line per request to filename
+#
+class TraceWriter:
+    def __init__(self, filename):
+        self.tracefile = open(filename, 'a')
+        self.lock = threading.Lock()
+
+    def __call__(self, request, response, seconds, error):
+        trace = {
+            'time': time.time(), 'profile': getProfile(), 'method': request.method,
+            'endpoint': endpoint_name(request.method, request.url), 'url': request.url,
+            'seconds': seconds, 'bytesSent': body_length(request.body),
+        }
+        if error != None:
+            trace['error'] = repr(error)
+        else:
+            trace['status'] = response.status_code
+            trace['bytesReceived'] = len(response.content)
+        with self.lock:
+            self.tracefile.write(json.dumps(trace) + '\n')
+
+    def close(self):
+        with self.lock:
+            self.tracefile.close()
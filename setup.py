@@ -0,0 +1,21 @@
+from setuptools import setup, find_packages
+
+setup(
+    name='devops-scripts',
+    version='0.1.0',
+    description='Python scripts to automate various devops tasks',
+    author='Chris Maeda',
+    author_email='cmaeda@cmaeda.com',
+    license='GPLv3',
+    packages=find_packages(),
+    install_requires=['click', 'requests'],
+    extras_require={
+        'zstd': ['zstandard'],
+        'async': ['aiohttp'],
+    },
+    entry_points={
+        'console_scripts': [
+            'devops=devops.cli:main',
+        ],
+    },
+)